@@ -0,0 +1,147 @@
+import gzip
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.config import settings
+from ..services.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional, responses are then only gzipped
+    brotli = None
+
+
+def supported_encodings() -> tuple:
+    """Content codings the server can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The best supported coding allowed by an Accept-Encoding header, if any"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best = None
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best[0] if best is not None else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.brotli_quality)
+    # mtime=0 makes the output depend on the body only
+    return gzip.compress(body, compresslevel=settings.gzip_level, mtime=0)
+
+
+def _compressible(content_type: str) -> bool:
+    return (content_type.startswith(('application/json', 'text/'))
+            and not content_type.startswith('text/event-stream'))
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli compression of JSON and text responses.
+
+    Bodies shorter than minimum_size are sent as they are. Compressed
+    bodies of cacheable responses (public, with an ETag) are kept in cache
+    keyed by ETag and coding; as catalog ETags are derived from the catalog
+    state, hot lists are compressed once per catalog change. Streaming
+    (server-sent events) responses pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, cache: TTLCache):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        start: Optional[Message] = None
+        chunks: list = []
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=message['headers'])
+                if message['status'] == 304:
+                    headers.add_vary_header('Accept-Encoding')
+                    passthrough = True
+                    await send(message)
+                    return
+                if ('content-encoding' in headers
+                        or not _compressible(headers.get('content-type', ''))):
+                    passthrough = True
+                    await send(message)
+                    return
+                # The body depends on Accept-Encoding, also for 304 and
+                # uncompressed answers, so shared caches keep the variants apart
+                headers.add_vary_header('Accept-Encoding')
+                if message['status'] != 200 or encoding is None:
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+            await self._send(send, start, b''.join(chunks), encoding)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send(self, send: Send, start: Message, body: bytes, encoding: str) -> None:
+        headers = MutableHeaders(raw=start['headers'])
+        if len(body) >= self.minimum_size:
+            etag = headers.get('etag')
+            key = None
+            if etag is not None and 'public' in headers.get('cache-control', ''):
+                key = (etag, encoding)
+            compressed = self.cache.get(key) if key is not None else None
+            if compressed is None:
+                compressed = await run_in_threadpool(compress, body, encoding)
+                if key is not None:
+                    self.cache.set(key, compressed)
+            if len(compressed) < len(body):
+                body = compressed
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                if etag is not None and not etag.startswith('W/'):
+                    # The ETag was computed for the uncompressed representation
+                    headers['ETag'] = f"W/{etag}"
+        await send(start)
+        await send({'type': 'http.response.body', 'body': body})
+
+
+# Compressed bodies of cacheable responses, by (ETag, coding)
+compressed_payloads = TTLCache(
+    max_entries=settings.compression_cache_size,
+    max_size=settings.compression_cache_max_bytes,
+    sizeof=len
+)
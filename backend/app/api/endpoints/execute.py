@@ -1,18 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from ...schemas.thesis import ExecutionRequest, ExecutionResult
-from ...services.file_service import FileStudentService
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ...core.config import settings
+from ...schemas.thesis import (
+    BatchExecutionRequest, BatchExecutionResult, ExecutionRequest, ExecutionResult, JobStatus
+)
 from ...services.executor import executor
+from ...services.file_service import FileStudentService
+from ...services.jobs import Job, JobRejectedError, RateLimitError, job_manager
 
 router = APIRouter()
 file_service = FileStudentService()
 
 
-@router.post("/{student_id}/execute", response_model=ExecutionResult)
-def execute_student_code(
-    student_id: str,
-    request: ExecutionRequest
-):
-    """Execute student's Python code with provided arguments"""
+def _main_code_path(student_id: str) -> Path:
+    """Path of the student's main code file, or an HTTP error"""
     # Get student
     student = file_service.get_student_by_id(student_id)
     if not student:
@@ -27,25 +36,196 @@ def execute_student_code(
     if not main_file:
         raise HTTPException(status_code=400, detail="Не указан основной файл кода")
     
-    # Get code content
-    code_content = file_service.get_student_code_file(student_id, main_file)
-    if not code_content:
+    code_path = file_service.get_student_code_path(student_id, main_file)
+    if code_path is None or not code_path.is_file():
         raise HTTPException(status_code=404, detail="Файл кода не найден")
-    
-    # Execute code
-    success, result, error, execution_time = executor.execute_code(
-        code=code_content,
-        args=request.args
+    return code_path
+
+
+def _client_id(http_request: Request) -> str:
+    """Client address for fair scheduling; X-Real-IP is trusted only from known proxies"""
+    peer = http_request.client.host if http_request.client else 'unknown'
+    if peer in settings.trusted_proxies:
+        return http_request.headers.get('x-real-ip', peer)
+    return peer
+
+
+def _submit(student_id: str, request: ExecutionRequest, http_request: Request,
+            on_output: Optional[Callable[[str], None]] = None):
+    """Queue an execution job, answering 429 when it is not admitted"""
+    task = partial(
+        executor.execute_file,
+        _main_code_path(student_id),
+        args=request.args,
+        seed=request.seed,
+        use_cache=request.use_cache,
+        profile=request.profile,
+        on_output=on_output
     )
-    
-    return ExecutionResult(
-        success=success,
-        result=result,
-        error=error,
-        execution_time=execution_time
+    try:
+        return job_manager.submit(student_id, task, _client_id(http_request))
+    except JobRejectedError as e:
+        raise _rejected(e)
+
+
+def _rejected(error: JobRejectedError) -> HTTPException:
+    if isinstance(error, RateLimitError):
+        detail = "Слишком много запусков, повторите попытку позже"
+    else:
+        detail = "Очередь выполнения переполнена, повторите попытку позже"
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+@router.post("/{student_id}/execute", response_model=ExecutionResult)
+async def execute_student_code(
+    student_id: str,
+    request: ExecutionRequest,
+    http_request: Request
+):
+    """Execute student's Python code with provided arguments"""
+    # The code runs in the job queue; waiting for it does not hold a thread
+    job = _submit(student_id, request, http_request)
+    return await asyncio.wrap_future(job.future)
+
+
+@router.post("/{student_id}/execute/batch", response_model=BatchExecutionResult)
+async def execute_student_code_batch(
+    student_id: str,
+    request: BatchExecutionRequest,
+    http_request: Request
+):
+    """
+    Execute student's code once per argument set (e.g. a parameter grid).
+
+    The argument sets are spread over the worker pool; every worker runs
+    the module once and then calls main() for each of its argument sets.
+    """
+    if len(request.args) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много наборов аргументов (максимум {settings.max_batch_size})"
+        )
+    code_path = _main_code_path(student_id)
+    start_time = time.time()
+    results: list = [None] * len(request.args)
+
+    def on_result(index: int, result: ExecutionResult) -> None:
+        results[index] = result
+
+    # Argument sets are dealt out round-robin, so early results of every
+    # worker are early in the batch
+    stride = min(settings.executor_pool_size, len(request.args))
+    client_id = _client_id(http_request)
+    jobs: list[Job] = []
+    try:
+        for offset in range(stride):
+            # Every argument set is one execution for the rate limit; the
+            # whole batch is charged with its first job
+            indices = list(range(offset, len(request.args), stride))
+            task = partial(
+                executor.execute_batch_file,
+                code_path,
+                [request.args[index] for index in indices],
+                indices=indices,
+                seed=request.seed,
+                use_cache=request.use_cache,
+                on_result=on_result
+            )
+            jobs.append(job_manager.submit(student_id, task, client_id,
+                                           cost=len(request.args) if offset == 0 else 0))
+    except JobRejectedError as e:
+        for job in jobs:
+            job_manager.cancel(job.id)
+        raise _rejected(e)
+
+    summaries = await asyncio.gather(*(asyncio.wrap_future(job.future) for job in jobs))
+    # A job cancelled or failed before it ran reports only its summary
+    for offset, summary in enumerate(summaries):
+        for index in range(offset, len(results), stride):
+            if results[index] is None:
+                results[index] = ExecutionResult(success=False, error=summary.error, execution_time=0.0)
+
+    return BatchExecutionResult(results=results, execution_time=time.time() - start_time)
+
+
+def _sse(event: str, data) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/{student_id}/execute/stream")
+async def stream_student_code(
+    student_id: str,
+    request: ExecutionRequest,
+    http_request: Request
+):
+    """
+    Execute student's code, streaming its output as Server-Sent Events:
+    a "job" event with the job id, "output" events with stdout chunks as
+    they are printed and a final "result" event with the ExecutionResult.
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=settings.stream_buffer_chunks)
+    stopped = threading.Event()
+
+    def on_output(text: str) -> None:
+        # Runs in the job's dispatcher thread. Waiting for room in the
+        # buffer stalls the job until the client catches up; output of a
+        # client that stopped reading altogether is dropped.
+        if stopped.is_set():
+            return
+        put = asyncio.run_coroutine_threadsafe(chunks.put(text), loop)
+        try:
+            put.result(timeout=settings.code_execution_timeout)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError, RuntimeError):
+            put.cancel()
+            stopped.set()
+
+    job = _submit(student_id, request, http_request, on_output)
+
+    async def events():
+        try:
+            yield _sse('job', {'job_id': job.id})
+            finished = asyncio.wrap_future(job.future)
+            while True:
+                chunk = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({chunk, finished}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    break
+                yield _sse('output', chunk.result())
+            # on_output returns only once its chunk is queued, so every
+            # chunk is already here when the job has finished
+            while not chunks.empty():
+                yield _sse('output', chunks.get_nowait())
+            yield _sse('result', finished.result().model_dump())
+        finally:
+            # Client went away (or the job is done): stop the job
+            stopped.set()
+            job_manager.cancel(job.id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+@router.post("/{student_id}/jobs", response_model=JobStatus, status_code=202)
+def submit_execution_job(
+    student_id: str,
+    request: ExecutionRequest,
+    http_request: Request
+):
+    """Queue execution of student's code and return the job id immediately"""
+    job = _submit(student_id, request, http_request)
+    return job_manager.describe(job)
+
+
 @router.get("/{student_id}/code")
 def get_student_code_info(student_id: str):
     """Get information about student's code files"""
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException, Response
+from ...services.figures import figure_store
+
+router = APIRouter()
+
+
+@router.get("/figures/{figure_id}")
+def get_figure(figure_id: str):
+    """Get a figure produced by a code execution"""
+    image = figure_store.get(figure_id)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Изображение не найдено")
+    # The id is the hash of the image, so it can be cached forever
+    return Response(
+        content=image,
+        media_type=figure_store.media_type(figure_id),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from ...schemas.thesis import JobStatus
+from ...services.jobs import job_manager
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """Get status and, once finished, result of an execution job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job_manager.describe(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+def cancel_job(job_id: str):
+    """Cancel a queued or running execution job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job_manager.describe(job)
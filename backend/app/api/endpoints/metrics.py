@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Query
+from ..compression import compressed_payloads
+from ...services.code_cache import code_cache
+from ...services.executor import executor
+from ...services.figures import figure_store
+from ...services.jobs import job_manager
+from ...services.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics(
+    students: int = Query(20, ge=0, le=1000, description="Студентов в разбивке по нагрузке")
+):
+    """
+    Execution counters, cache hit rates and histograms of execution stages,
+    CPU time and peak memory, overall and per student (heaviest first)
+    """
+    return {
+        "counters": metrics.snapshot(),
+        "histograms": metrics.histograms(),
+        "by_student": [
+            {"student_id": student_id, **summaries}
+            for student_id, summaries in metrics.breakdown(sort_by='cpu_time', limit=students)
+        ],
+        "code_cache": code_cache.stats(),
+        "result_cache": executor.result_cache.stats(),
+        "figures": figure_store.stats(),
+        "compressed_payloads": compressed_payloads.stats(),
+        "jobs": job_manager.stats()
+    }
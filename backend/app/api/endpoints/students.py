@@ -3,40 +3,115 @@ API endpoints для работы со студентами (файловая с
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.api.http_cache import conditional, make_etag, request_etag
+from app.core.config import settings
+from app.schemas.thesis import FacetsResponse, SearchResponse
 from app.services.file_service import FileStudentService
+from app.services.listing import paginate, parse_fields, parse_sort, project, sort_students
 
 router = APIRouter()
 file_service = FileStudentService()
 
-@router.get("/students")
+def _not_modified(request: Request, response: Response) -> Optional[Response]:
+    """
+    ETag ответа, зависящего только от каталога и параметров запроса;
+    ответ 304, если у клиента актуальная копия
+    """
+    return conditional(request, response, request_etag(request, file_service.catalog.fingerprint()))
+
+@router.get("/students", response_model=SearchResponse, response_model_exclude_none=True)
 async def get_students(
+    request: Request,
+    response: Response,
     year: Optional[int] = Query(None, description="Фильтр по году выпуска"),
-    search: Optional[str] = Query(None, description="Поисковый запрос")
+    search: Optional[str] = Query(None, description="Поисковый запрос"),
+    advisor: Optional[str] = Query(None, description="Фильтр по научному руководителю"),
+    keyword: Optional[str] = Query(None, description="Фильтр по ключевому слову"),
+    has_code: Optional[bool] = Query(None, description="Фильтр по наличию кода"),
+    match: str = Query("all", pattern="^(all|any)$", description="Совпадение всех (all) или любого (any) слова запроса"),
+    fuzzy: bool = Query(True, description="Нечеткий поиск по имени и руководителю, если точных совпадений нет"),
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    per_page: Optional[int] = Query(None, ge=1, le=settings.max_per_page, description="Размер страницы (по умолчанию - весь список)"),
+    sort: Optional[str] = Query(None, description="Поле сортировки: relevance, name, year, title, added_date, defense_date; '-' - по убыванию"),
+    fields: Optional[str] = Query(None, description="Возвращаемые поля через запятую, например id,name,thesis.title"),
+    facets: bool = Query(False, description="Добавить в ответ количество по фасетам")
 ):
     """
-    Получение списка студентов с возможностью фильтрации и поиска
+    Получение списка студентов с возможностью фильтрации, поиска,
+    сортировки и постраничной выдачи
     """
     try:
-        if search:
-            students = file_service.search_students(search)
-        elif year:
-            students = file_service.get_students_by_year(year)
-        else:
-            students = file_service.get_all_students()
+        parse_sort(sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    
+    try:
+        students, facet_counts = file_service.find_students(
+            query=search,
+            filters={"year": year, "advisor": advisor, "keyword": keyword, "has_code": has_code},
+            match_all=(match == "all"),
+            fuzzy=fuzzy,
+            with_facets=facets
+        )
+        
+        students = sort_students(students, sort)
+        page_items, page_size, total_pages = paginate(students, page, per_page)
+        paths = parse_fields(fields)
         
         return {
-            "students": students,
-            "total": len(students)
+            "students": [project(student, paths) for student in page_items],
+            "total": len(students),
+            "page": page,
+            "per_page": page_size,
+            "total_pages": total_pages,
+            "facets": facet_counts
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения данных: {str(e)}")
 
+@router.get("/facets", response_model=FacetsResponse)
+async def get_facets(
+    request: Request,
+    response: Response,
+    year: Optional[int] = Query(None, description="Фильтр по году выпуска"),
+    search: Optional[str] = Query(None, description="Поисковый запрос"),
+    advisor: Optional[str] = Query(None, description="Фильтр по научному руководителю"),
+    keyword: Optional[str] = Query(None, description="Фильтр по ключевому слову"),
+    has_code: Optional[bool] = Query(None, description="Фильтр по наличию кода"),
+    match: str = Query("all", pattern="^(all|any)$", description="Совпадение всех (all) или любого (any) слова запроса"),
+    fuzzy: bool = Query(True, description="Нечеткий поиск по имени и руководителю, если точных совпадений нет")
+):
+    """
+    Количество студентов по годам, руководителям, ключевым словам и
+    наличию кода для текущего запроса и фильтров
+    """
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    
+    students, facet_counts = file_service.find_students(
+        query=search,
+        filters={"year": year, "advisor": advisor, "keyword": keyword, "has_code": has_code},
+        match_all=(match == "all"),
+        fuzzy=fuzzy,
+        with_facets=True
+    )
+    return {"total": len(students), "facets": facet_counts}
+
 @router.get("/students/{student_id}")
-async def get_student(student_id: str):
+async def get_student(student_id: str, request: Request, response: Response):
     """
     Получение информации о конкретном студенте
     """
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    
     student = file_service.get_student_by_id(student_id)
     
     if not student:
@@ -45,33 +120,49 @@ async def get_student(student_id: str):
     return student
 
 @router.get("/students/{student_id}/code/{filename}")
-async def get_student_code_file(student_id: str, filename: str):
+async def get_student_code_file(student_id: str, filename: str, request: Request, response: Response):
     """
     Получение файла кода студента
+    
+    ETag вычисляется по хэшу содержимого файла.
     """
-    content = file_service.get_student_code_file(student_id, filename)
+    code = file_service.get_student_code(student_id, filename)
     
-    if content is None:
+    if code is None:
         raise HTTPException(status_code=404, detail="Файл не найден")
     
+    not_modified = conditional(request, response, make_etag(code.digest, filename))
+    if not_modified is not None:
+        return not_modified
+    
     return {
         "filename": filename,
-        "content": content
+        "content": code.source
     }
 
 @router.get("/years")
-async def get_available_years():
+async def get_available_years(request: Request, response: Response):
     """
-    Получение списка доступных годов выпуска
+    Получение списка доступных годов выпуска и количества студентов по годам
+    
+    Годы берутся из манифеста каталога, записи студентов не перебираются.
     """
-    years = file_service.get_available_years()
-    return {"years": years}
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    
+    counts = file_service.get_year_counts()
+    return {"years": list(counts), "counts": counts}
 
 @router.get("/statistics")
-async def get_statistics():
+async def get_statistics(request: Request, response: Response):
     """
     Получение статистики по базе данных
     """
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    
     stats = file_service.get_statistics()
     return stats
 
@@ -79,14 +170,15 @@ async def get_statistics():
 async def health_check():
     """
     Проверка работоспособности API
+    
+    Дешевая проверка живости: архив не сканируется, используются данные
+    каталога, уже загруженного в память.
     """
-    try:
-        # Проверяем доступность файловой системы
-        stats = file_service.get_statistics()
-        return {
-            "status": "healthy",
-            "data_available": stats["total_students"] > 0,
-            "total_students": stats["total_students"]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Сервис недоступен: {str(e)}")
\ No newline at end of file
+    catalog = file_service.catalog
+    return {
+        "status": "healthy",
+        "catalog_loaded": catalog.loaded,
+        "catalog_watched": catalog.watched,
+        "data_available": len(catalog) > 0,
+        "total_students": len(catalog)
+    }
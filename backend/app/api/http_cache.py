@@ -0,0 +1,48 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from ..core.config import settings
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag from the values that determine a response body"""
+    digest = hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def request_etag(request: Request, version: str) -> str:
+    """
+    ETag of a GET response that depends only on the request URL and on
+    version (e.g. the catalog fingerprint or a file hash)
+    """
+    return make_etag(version, request.url.path, str(request.query_params))
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def conditional(request: Request, response: Response, etag: str,
+                max_age: Optional[int] = None) -> Optional[Response]:
+    """
+    Set the ETag and Cache-Control headers of a response; returns a 304
+    response to send instead when the client's copy is still current
+    """
+    if max_age is None:
+        max_age = settings.http_cache_max_age
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -13,9 +13,62 @@ class Settings(BaseSettings):
     # CORS
     backend_cors_origins: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
+    # Student catalog
+    catalog_refresh_interval: float = 1.0
+    catalog_snapshot_path: str = ".catalog_snapshot"  # compiled catalog for fast cold start; empty disables
+    catalog_snapshot_delay: float = 5.0  # seconds after a change before the snapshot is rewritten
+    catalog_watch: bool = True  # update the catalog from filesystem events instead of per-request stat
+    catalog_watch_debounce: float = 0.2  # seconds without events before changes are applied
+    catalog_poll_interval: float = 2.0  # rescan period when inotify is unavailable
+    fuzzy_search_threshold: float = 0.3
+    max_per_page: int = 100
+    facet_limit: int = 50
+    http_cache_max_age: int = 60  # seconds catalog responses may be reused without revalidation
+    
+    # Response compression (brotli is used when the package is installed)
+    compression_min_size: int = 1024  # bytes; smaller bodies are sent uncompressed
+    gzip_level: int = 6
+    brotli_quality: int = 5
+    compression_cache_size: int = 256  # compressed bodies of cacheable responses
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
+    
     # Python execution
     code_execution_timeout: int = 10
     max_code_length: int = 10000
+    executor_pool_size: int = 2
+    max_batch_size: int = 100  # argument sets per batch execution
+    code_execution_memory_limit: int = 512  # MB of extra address space per execution
+    max_output_size: int = 100000  # characters of stdout/stderr kept per execution
+    profile_top_n: int = 20  # functions and allocation sites reported by profiling
+    
+    # Figures produced by executions (matplotlib, rendered with Agg)
+    figure_format: str = "png"  # png or webp (lossless)
+    figure_dpi: int = 100
+    max_figures: int = 10  # per execution
+    figure_dir: str = ".figures"  # shared by all API processes
+    figure_cache_size: int = 512
+    figure_cache_max_bytes: int = 64 * 1024 * 1024
+    
+    # Cache of deterministic execution results
+    execution_cache_size: int = 256
+    execution_cache_ttl: float = 3600.0
+    execution_cache_max_bytes: int = 16 * 1024 * 1024
+    execution_cache_seed: int = 0
+    
+    # Asynchronous execution jobs
+    job_queue_size: int = 32  # queued jobs before submissions are rejected with 429
+    job_history_size: int = 1000
+    job_result_ttl: float = 600.0
+    stream_buffer_chunks: int = 64  # output chunks buffered per streaming client
+    
+    # Fair scheduling of execution jobs between clients (by IP address)
+    client_max_queued: int = 8
+    client_max_running: Optional[int] = None  # default: executor_pool_size - 1 (at least 1)
+    student_max_running: int = 2
+    client_rate_limit: float = 1.0  # jobs per second, sustained
+    client_burst: int = 10  # jobs submitted at once before the rate limit applies
+    client_weights: dict[str, float] = {}  # larger share of the executor, e.g. {"10.0.0.5": 4}
+    trusted_proxies: list[str] = []  # peers whose X-Real-IP header names the client
     
     class Config:
         env_file = ".env"
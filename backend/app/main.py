@@ -1,13 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .api.endpoints import students, execute
+from .api.compression import CompressionMiddleware, compressed_payloads
+from .api.endpoints import students, execute, figures, jobs, metrics
+from .services.catalog_watcher import watch_catalog
+from .services.executor import executor
+from .services.jobs import job_manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the student catalog (from its snapshot where still valid)
+    # before serving the first request
+    students.file_service.catalog.refresh()
+    watcher = None
+    if settings.catalog_watch:
+        # From here on the catalog is updated from filesystem events
+        watcher = watch_catalog(
+            students.file_service.catalog,
+            settings.catalog_watch_debounce,
+            settings.catalog_poll_interval
+        )
+    # Pre-warm the code execution workers
+    executor.start()
+    job_manager.start()
+    yield
+    job_manager.shutdown()
+    executor.shutdown()
+    if watcher is not None:
+        watcher.stop()
+
 
 app = FastAPI(
     title=settings.project_name,
     description="База данных дипломных работ кафедры математической статистики и случайных процессов МГУ",
     version="2.0.0",
-    openapi_url=f"{settings.api_v1_str}/openapi.json"
+    openapi_url=f"{settings.api_v1_str}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -19,6 +49,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (added last, so it wraps the CORS middleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_min_size,
+    cache=compressed_payloads
+)
+
 # Include routers
 app.include_router(
     students.router,
@@ -32,6 +69,24 @@ app.include_router(
     tags=["execution"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix=f"{settings.api_v1_str}",
+    tags=["execution"]
+)
+
+app.include_router(
+    figures.router,
+    prefix=f"{settings.api_v1_str}",
+    tags=["execution"]
+)
+
+app.include_router(
+    metrics.router,
+    prefix=f"{settings.api_v1_str}",
+    tags=["metrics"]
+)
+
 
 @app.get("/")
 def read_root():
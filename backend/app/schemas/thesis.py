@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
@@ -34,6 +34,42 @@ class Student(StudentBase):
 
 class ExecutionRequest(BaseModel):
     args: Optional[str] = None
+    seed: Optional[int] = None
+    use_cache: bool = False
+    profile: bool = False
+
+
+class ProfileFunction(BaseModel):
+    function: str
+    filename: str
+    line: int
+    calls: int
+    total_time: float
+    cumulative_time: float
+
+
+class ProfileAllocation(BaseModel):
+    filename: str
+    line: int
+    size: int  # bytes allocated at the peak of traced memory
+    count: int
+
+
+class ExecutionProfile(BaseModel):
+    functions: list[ProfileFunction]  # by cumulative time
+    allocations: list[ProfileAllocation]  # by allocated size
+    peak_memory: int  # bytes
+
+
+class ExecutionStats(BaseModel):
+    queue_wait: float = 0.0  # seconds in the job queue
+    compile: float = 0.0  # compiling (first run of a file) and loading the code in the worker
+    setup: float = 0.0  # preparing globals (and running the module body of a batch)
+    run: float = 0.0
+    render: float = 0.0  # rendering figures
+    serialization: float = 0.0  # passing the result back from the worker
+    cpu_time: float = 0.0  # seconds of CPU used by the worker
+    peak_rss: int = 0  # bytes
 
 
 class ExecutionResult(BaseModel):
@@ -41,6 +77,32 @@ class ExecutionResult(BaseModel):
     result: Optional[str] = None
     error: Optional[str] = None
     execution_time: Optional[float] = None
+    cached: bool = False
+    profile: Optional[ExecutionProfile] = None
+    figures: list[str] = Field(default_factory=list)  # ids, served by /figures/{id}
+    stats: Optional[ExecutionStats] = None
+
+
+class BatchExecutionRequest(BaseModel):
+    args: list[Optional[str]] = Field(..., min_length=1)  # one argument string per run
+    seed: Optional[int] = None
+    use_cache: bool = False
+
+
+class BatchExecutionResult(BaseModel):
+    results: list[ExecutionResult]  # in the order of the argument sets
+    execution_time: float
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    student_id: str
+    status: str  # queued, running, completed, cancelled
+    queue_position: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ExecutionResult] = None
 
 
 class ExecutionLogBase(BaseModel):
@@ -59,9 +121,20 @@ class ExecutionLog(ExecutionLogBase):
         from_attributes = True
 
 
+class FacetCount(BaseModel):
+    value: Any
+    count: int
+
+
 class SearchResponse(BaseModel):
-    students: list[Student]
+    students: list[Dict[str, Any]]
     total: int
     page: int
     per_page: int
-    total_pages: int
\ No newline at end of file
+    total_pages: int
+    facets: Optional[Dict[str, list[FacetCount]]] = None
+
+
+class FacetsResponse(BaseModel):
+    total: int
+    facets: Dict[str, list[FacetCount]]
\ No newline at end of file
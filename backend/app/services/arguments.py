@@ -0,0 +1,69 @@
+import re
+from typing import Any, List, Optional, Tuple
+
+_INT = re.compile(r'[+-]?\d+')
+_FLOAT = re.compile(r'[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?')
+_QUOTES = ('"', "'")
+
+
+def _convert(token: str) -> Any:
+    """Typed value of an unquoted argument"""
+    if _INT.fullmatch(token):
+        return int(token)
+    if _FLOAT.fullmatch(token):
+        return float(token)
+    return token
+
+
+def _read_quoted(text: str, start: int) -> Tuple[str, int]:
+    """Quoted string starting at start and the position after its closing quote"""
+    quote = text[start]
+    chars = []
+    position = start + 1
+    while position < len(text):
+        char = text[position]
+        if char == '\\' and position + 1 < len(text):
+            chars.append(text[position + 1])
+            position += 2
+            continue
+        if char == quote:
+            return ''.join(chars), position + 1
+        chars.append(char)
+        position += 1
+    raise ValueError(f"unterminated string starting at position {start + 1}")
+
+
+def parse_args(text: Optional[str]) -> List[Any]:
+    """
+    Parse a comma-separated argument string into typed values.
+
+    Integers and floats (with sign and exponent, e.g. -3, -0.5, 1e-3)
+    become numbers; quoted values ("a, b" or 'it\\'s') become strings and
+    may contain commas and escaped quotes; anything else is kept as a
+    string. Raises ValueError on malformed input.
+    """
+    if text is None or not text.strip():
+        return []
+
+    values = []
+    position = 0
+    length = len(text)
+    while True:
+        while position < length and text[position].isspace():
+            position += 1
+        if position < length and text[position] in _QUOTES:
+            value, position = _read_quoted(text, position)
+            while position < length and text[position].isspace():
+                position += 1
+            if position < length and text[position] != ',':
+                raise ValueError(f"unexpected character after string at position {position + 1}")
+        else:
+            end = text.find(',', position)
+            if end == -1:
+                end = length
+            value = _convert(text[position:end].strip())
+            position = end
+        values.append(value)
+        if position >= length:
+            return values
+        position += 1  # skip the comma
@@ -0,0 +1,514 @@
+"""
+Каталог студентов в памяти процесса
+
+Дерево data/ читается один раз, разобранные записи хранятся в памяти,
+а при обновлении перечитываются только те директории годов и студентов,
+у которых изменилось время модификации. Если задан файл снимка, при
+первом обновлении каталог заполняется из него, и с диска читаются только
+изменившиеся с момента сборки снимка директории. Снимок пересобирается
+в фоне, с задержкой после изменений, и только одним процессом - тем,
+что удерживает файл блокировки рядом со снимком.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: снимок пересобирает каждый процесс
+    fcntl = None
+
+from .catalog_snapshot import CatalogSnapshot, Signature, SnapshotError, write_snapshot
+
+
+def _stat_mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def student_signature(student_path: Path) -> Optional[Signature]:
+    """
+    Сигнатура директории студента по данным stat (без чтения файлов)
+    """
+    try:
+        info_stat = (student_path / "info.json").stat()
+    except OSError:
+        return None
+    return (info_stat.st_mtime_ns, info_stat.st_size, _stat_mtime(student_path / "code"))
+
+
+def load_student_record(data_path: Path, year: int, student_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Загрузка информации о студенте из файла info.json
+    """
+    info_path = data_path / str(year) / student_dir / "info.json"
+
+    if not info_path.exists():
+        return None
+
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # Добавляем дополнительную информацию
+        data['id'] = f"{year}_{student_dir}"
+        data['student_dir'] = student_dir
+        data['added_date'] = datetime.fromtimestamp(info_path.stat().st_mtime).isoformat()
+
+        # Проверяем наличие кода
+        code_path = data_path / str(year) / student_dir / "code"
+        if code_path.exists() and data.get('code', {}).get('has_code', False):
+            data['code']['files'] = [f.name for f in code_path.iterdir() if f.is_file()]
+
+        return data
+
+    except (json.JSONDecodeError, KeyError, OSError) as e:
+        print(f"Ошибка загрузки данных студента {student_dir} ({year}): {e}")
+        return None
+
+
+class StudentCatalog:
+    """
+    Общий для процесса каталог записей студентов.
+
+    Записи, возвращаемые каталогом, разделяются между запросами и не должны
+    изменяться вызывающим кодом.
+    """
+
+    def __init__(self, data_path: Path, refresh_interval: float = 0.0,
+                 snapshot_path: Optional[Path] = None, snapshot_delay: float = 5.0):
+        self.data_path = data_path
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = snapshot_path
+        self.snapshot_delay = snapshot_delay
+        self.lock = threading.RLock()
+        self.generation = 0
+        # Изменения вносит наблюдатель за файловой системой
+        self.watched = False
+
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._signatures: Dict[str, Optional[Signature]] = {}
+        self._root_mtime: Optional[int] = None
+        self._year_mtimes: Dict[int, Optional[int]] = {}
+        self._year_students: Dict[int, List[str]] = {}
+        self._last_check: Optional[float] = None
+        self._indexes: Dict[str, Any] = {}
+        # Снимок не соответствует содержимому каталога и будет пересобран
+        self._snapshot_stale = snapshot_path is not None
+        self._snapshot_timer: Optional[threading.Timer] = None
+        self._snapshot_write_lock = threading.Lock()
+        # Открытый файл блокировки, пока процесс пересобирает снимок
+        self._snapshot_lock_file = None
+
+        # Манифест годов: число студентов по годам и годы по убыванию
+        self._year_counts: Dict[int, int] = {}
+        self._manifest: Optional[List[int]] = None
+
+        self._fingerprint_generation = -1
+        self._fingerprint = ''
+
+        self._sorted_generation = -1
+        self._sorted_all: List[Dict[str, Any]] = []
+        self._sorted_by_year: Dict[int, List[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Был ли каталог хотя бы раз синхронизирован с файловой системой
+        """
+        return self._last_check is not None
+
+    # --- Обновление -------------------------------------------------------
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Синхронизация каталога с файловой системой.
+
+        Возвращает True, если содержимое каталога изменилось. Пока за
+        каталогом следит наблюдатель (catalog_watcher), изменения вносит
+        он, и без force файловая система не проверяется.
+        """
+        with self.lock:
+            if self.watched and not force:
+                return False
+            now = time.monotonic()
+            if (not force and self._last_check is not None
+                    and now - self._last_check < self.refresh_interval):
+                return False
+            return self._sync(force)
+
+    def rescan(self) -> bool:
+        """
+        Синхронизация по stat всех директорий, независимо от наблюдателя
+        """
+        with self.lock:
+            return self._sync(False)
+
+    def update(self, years: Set[int], students: Set[Tuple[int, str]]) -> bool:
+        """
+        Инкрементальное обновление: перечитываются только указанные годы
+        (состав директорий студентов) и директории студентов (год, директория)
+        """
+        with self.lock:
+            updated = False
+            if years:
+                self._root_mtime = _stat_mtime(self.data_path)
+            for year in years:
+                self._year_students.setdefault(year, [])
+                self._year_mtimes.setdefault(year, None)
+                updated |= self._refresh_year(year, False)
+            relisted = set(years)
+            for year, student_dir in sorted(students):
+                if year in relisted or year not in self._year_students:
+                    continue
+                if _stat_mtime(self.data_path / str(year)) != self._year_mtimes.get(year):
+                    # Директории студентов добавлены или удалены
+                    relisted.add(year)
+                    updated |= self._refresh_year(year, False)
+                else:
+                    updated |= self._refresh_student(year, student_dir, False)
+            return self._commit(False, updated)
+
+    def _sync(self, force: bool) -> bool:
+        changed = False
+        if self._last_check is None and self.snapshot_path is not None:
+            changed = self._load_snapshot()
+        self._last_check = time.monotonic()
+
+        updated = False
+        root_mtime = _stat_mtime(self.data_path)
+        if root_mtime != self._root_mtime or force:
+            self._root_mtime = root_mtime
+            years = self._list_years()
+            for year in list(self._year_students):
+                if year not in years:
+                    updated |= self._drop_year(year)
+            for year in years:
+                self._year_students.setdefault(year, [])
+                self._year_mtimes.setdefault(year, None)
+
+        for year in list(self._year_students):
+            updated |= self._refresh_year(year, force)
+
+        return self._commit(changed, updated)
+
+    def _commit(self, changed: bool, updated: bool) -> bool:
+        """
+        Завершение обновления: updated - изменения, прочитанные с диска
+        (после них пересобирается снимок)
+        """
+        if updated:
+            self._snapshot_stale = self.snapshot_path is not None
+        if self._snapshot_stale:
+            self._schedule_snapshot()
+
+        changed |= updated
+        if changed:
+            self.generation += 1
+        return changed
+
+    def layout(self) -> Dict[int, List[str]]:
+        """
+        Известные каталогу годы и директории студентов (под self.lock)
+        """
+        return {year: list(student_dirs) for year, student_dirs in self._year_students.items()}
+
+    # --- Снимок -----------------------------------------------------------
+
+    def _load_snapshot(self) -> bool:
+        """
+        Заполнение пустого каталога из снимка. Сохраняются и сигнатуры,
+        поэтому последующее обновление перечитает только изменившееся.
+        """
+        try:
+            snapshot = CatalogSnapshot(self.snapshot_path)
+        except SnapshotError:
+            return False
+
+        changed = False
+        with snapshot:
+            self._root_mtime = snapshot.root_mtime
+            for year, year_mtime in snapshot.years():
+                self._year_mtimes[year] = year_mtime
+                student_dirs = self._year_students[year] = []
+                for student_dir, signature, record in snapshot.students(year):
+                    student_dirs.append(student_dir)
+                    student_id = f"{year}_{student_dir}"
+                    self._signatures[student_id] = signature
+                    changed |= self._set_record(student_id, record)
+        self._snapshot_stale = False
+        return changed
+
+    def save_snapshot(self) -> None:
+        """
+        Запись текущего состояния каталога в файл снимка.
+
+        Под блокировкой каталога состояние только копируется (записи не
+        изменяются на месте, поэтому достаточно копий словарей), а
+        кодирование и запись файла выполняются уже без нее.
+        """
+        with self._snapshot_write_lock:
+            with self.lock:
+                if self.snapshot_path is None:
+                    return
+                years = {
+                    year: (self._year_mtimes.get(year), list(student_dirs))
+                    for year, student_dirs in self._year_students.items()
+                }
+                root_mtime = self._root_mtime
+                signatures = dict(self._signatures)
+                records = dict(self._records)
+                # При ошибке запись не повторяется до следующего изменения каталога
+                self._snapshot_stale = False
+            try:
+                write_snapshot(self.snapshot_path, root_mtime, years, signatures, records)
+            except OSError as e:
+                print(f"Ошибка записи снимка каталога {self.snapshot_path}: {e}")
+
+    def _schedule_snapshot(self) -> None:
+        """
+        Отложенная пересборка снимка (под self.lock): изменения, пришедшие
+        за snapshot_delay секунд, попадают в одну запись
+        """
+        if self._snapshot_timer is not None or not self._acquire_snapshot_lock():
+            return
+        self._snapshot_timer = threading.Timer(self.snapshot_delay, self._write_scheduled_snapshot)
+        self._snapshot_timer.daemon = True
+        self._snapshot_timer.start()
+
+    def _write_scheduled_snapshot(self) -> None:
+        with self.lock:
+            self._snapshot_timer = None
+        self.save_snapshot()
+
+    def _acquire_snapshot_lock(self) -> bool:
+        """
+        Может ли процесс пересобирать снимок: снимок пишет только процесс,
+        удерживающий блокировку файла <снимок>.lock. Блокировка держится до
+        завершения процесса, после чего ее захватывает другой.
+        """
+        if self._snapshot_lock_file is not None or fcntl is None:
+            return True
+        lock_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.lock")
+        try:
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(lock_path, 'a')
+        except OSError:
+            return False
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._snapshot_lock_file = lock_file
+        return True
+
+    def _list_years(self) -> List[int]:
+        try:
+            return [
+                int(entry.name) for entry in os.scandir(self.data_path)
+                if entry.is_dir() and entry.name.isdigit()
+            ]
+        except OSError:
+            return []
+
+    def _drop_year(self, year: int) -> bool:
+        changed = False
+        for student_dir in self._year_students.pop(year, []):
+            changed |= self._remove_student(f"{year}_{student_dir}")
+        self._year_mtimes.pop(year, None)
+        return changed
+
+    def _refresh_year(self, year: int, force: bool) -> bool:
+        year_path = self.data_path / str(year)
+        year_mtime = _stat_mtime(year_path)
+        if year_mtime is None:
+            return self._drop_year(year)
+
+        changed = False
+        if year_mtime != self._year_mtimes.get(year) or force:
+            # Изменился состав директорий студентов этого года
+            self._year_mtimes[year] = year_mtime
+            try:
+                current = sorted(
+                    entry.name for entry in os.scandir(year_path) if entry.is_dir()
+                )
+            except OSError:
+                current = []
+            for student_dir in self._year_students.get(year, []):
+                if student_dir not in current:
+                    changed |= self._remove_student(f"{year}_{student_dir}")
+            self._year_students[year] = current
+
+        for student_dir in self._year_students[year]:
+            changed |= self._refresh_student(year, student_dir, force)
+        return changed
+
+    def _refresh_student(self, year: int, student_dir: str, force: bool) -> bool:
+        student_id = f"{year}_{student_dir}"
+        signature = student_signature(self.data_path / str(year) / student_dir)
+        if not force and student_id in self._signatures and self._signatures[student_id] == signature:
+            return False
+
+        self._signatures[student_id] = signature
+        record = None
+        if signature is not None:
+            record = load_student_record(self.data_path, year, student_dir)
+        return self._set_record(student_id, record)
+
+    def _set_record(self, student_id: str, record: Optional[Dict[str, Any]]) -> bool:
+        year = int(student_id.split('_', 1)[0])
+        if record is None:
+            if self._records.pop(student_id, None) is None:
+                return False
+            self._count_year(year, -1)
+            for index in self._indexes.values():
+                index.remove(student_id)
+            return True
+        if student_id not in self._records:
+            self._count_year(year, 1)
+        self._records[student_id] = record
+        for index in self._indexes.values():
+            index.add(student_id, record)
+        return True
+
+    def _count_year(self, year: int, delta: int) -> None:
+        """
+        Обновление манифеста годов: числа загруженных студентов по годам
+        """
+        count = self._year_counts.get(year, 0) + delta
+        if count > 0:
+            self._year_counts[year] = count
+        else:
+            self._year_counts.pop(year, None)
+        if (count > 0) != (count - delta > 0):
+            # Год появился или исчез
+            self._manifest = None
+
+    def _remove_student(self, student_id: str) -> bool:
+        self._signatures.pop(student_id, None)
+        return self._set_record(student_id, None)
+
+    # --- Индексы ----------------------------------------------------------
+
+    def attach(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Подключение индекса, который обновляется вместе с каталогом.
+
+        Индекс должен реализовывать методы add(student_id, record) и
+        remove(student_id); они вызываются под блокировкой каталога, поэтому
+        чтение из индекса также выполняется под self.lock. Повторный вызов
+        с тем же именем возвращает уже подключенный индекс.
+        """
+        with self.lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = factory()
+                for student_id, record in self._records.items():
+                    index.add(student_id, record)
+                self._indexes[name] = index
+            return index
+
+    # --- Чтение -----------------------------------------------------------
+
+    def _ensure_sorted(self) -> None:
+        if self._sorted_generation == self.generation:
+            return
+        records = list(self._records.values())
+        records.sort(key=lambda x: (x['graduation_year'], x['name']))
+        by_year: Dict[int, List[Dict[str, Any]]] = {}
+        for student_id, record in self._records.items():
+            year = int(student_id.split('_', 1)[0])
+            by_year.setdefault(year, []).append(record)
+        for year_records in by_year.values():
+            year_records.sort(key=lambda x: x['name'])
+        self._sorted_all = records
+        self._sorted_by_year = by_year
+        self._sorted_generation = self.generation
+
+    def all(self) -> List[Dict[str, Any]]:
+        """
+        Все студенты, отсортированные по году выпуска и имени
+        """
+        with self.lock:
+            self.refresh()
+            self._ensure_sorted()
+            return list(self._sorted_all)
+
+    def by_year(self, year: int) -> List[Dict[str, Any]]:
+        """
+        Студенты из директории года, отсортированные по имени
+        """
+        with self.lock:
+            self.refresh()
+            self._ensure_sorted()
+            return list(self._sorted_by_year.get(year, []))
+
+    def get(self, student_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self.refresh()
+            return self._records.get(student_id)
+
+    def years(self) -> List[int]:
+        """
+        Годы, в которых есть хотя бы один загруженный студент, по убыванию
+        """
+        with self.lock:
+            self.refresh()
+            if self._manifest is None:
+                self._manifest = sorted(self._year_counts, reverse=True)
+            return list(self._manifest)
+
+    def fingerprint(self) -> str:
+        """
+        Хэш состояния каталога по сигнатурам директорий студентов.
+
+        В отличие от generation совпадает во всех процессах, читающих одно
+        и то же дерево data/, поэтому подходит для ETag.
+        """
+        with self.lock:
+            self.refresh()
+            if self._fingerprint_generation != self.generation:
+                digest = hashlib.sha256()
+                for student_id in sorted(self._signatures):
+                    digest.update(f"{student_id}:{self._signatures[student_id]}\n".encode('utf-8'))
+                self._fingerprint = digest.hexdigest()
+                self._fingerprint_generation = self.generation
+            return self._fingerprint
+
+    def year_counts(self) -> Dict[int, int]:
+        """
+        Число загруженных студентов по годам (годы по убыванию)
+        """
+        with self.lock:
+            self.refresh()
+            return {year: self._year_counts[year] for year in self.years()}
+
+
+_catalogs: Dict[Path, StudentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(data_path: Path, refresh_interval: float = 0.0,
+                snapshot_path: Optional[Path] = None, snapshot_delay: float = 5.0) -> StudentCatalog:
+    """
+    Общий каталог для директории данных (один на процесс)
+    """
+    key = data_path.resolve()
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = StudentCatalog(data_path, refresh_interval, snapshot_path, snapshot_delay)
+            _catalogs[key] = catalog
+        return catalog
@@ -0,0 +1,228 @@
+"""
+Бинарный снимок каталога студентов
+
+Снимок - один файл, в который компилируется дерево data/: таблица записей
+фиксированного размера, пул строк (идентификаторы и записи в JSON) и
+индекс по годам. При холодном старте процесс читает этот файл (через
+mmap) вместо открытия и разбора каждого info.json и листинга code/, а
+с диска перечитывает только директории, изменившиеся после сборки снимка
+(проверка по stat).
+
+Снимок - только кэш для холодного старта. Данные между процессами
+uvicorn он не разделяет: после чтения отображение закрывается, записи
+декодируются из JSON в память каждого процесса, и каждый процесс строит
+свои индексы (поиск, триграммы, фасеты, статистика), так как списки
+сортируются и проецируются по полным записям. Память по-прежнему растет
+с числом процессов.
+
+Формат (little-endian):
+    заголовок   HEADER
+    годы        YEAR * year_count, по возрастанию года
+    записи      RECORD * record_count, по (год, директория)
+    пул строк   UTF-8
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Сигнатура студента: (mtime info.json, размер info.json, mtime директории code)
+Signature = Tuple[int, int, Optional[int]]
+
+MAGIC = b'THCS'
+VERSION = 1
+
+# magic, версия, число годов, число записей, mtime data/ (или -1)
+HEADER = struct.Struct('<4sHxxIIq')
+# год, mtime директории года (или -1), первая запись, число записей
+YEAR = struct.Struct('<iqII')
+# смещение и длина имени директории, смещение и длина записи в пуле,
+# флаги, mtime info.json, размер info.json, mtime директории code
+RECORD = struct.Struct('<IIIIIqqq')
+
+HAS_SIGNATURE = 1
+HAS_CODE_MTIME = 2
+HAS_RECORD = 4
+
+
+class SnapshotError(Exception):
+    """Файл снимка отсутствует, поврежден или другой версии"""
+
+
+def _optional(value: Optional[int]) -> int:
+    return -1 if value is None else value
+
+
+def write_snapshot(path: Path, root_mtime: Optional[int],
+                   years: Dict[int, Tuple[Optional[int], List[str]]],
+                   signatures: Dict[str, Optional[Signature]],
+                   records: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Запись снимка: years - {год: (mtime директории, директории студентов)}.
+
+    Файл записывается во временный и затем атомарно заменяется, поэтому
+    процессы, уже открывшие прежний снимок, продолжают читать его.
+    """
+    pool = bytearray()
+    strings: Dict[bytes, int] = {}
+
+    def intern(data: bytes) -> Tuple[int, int]:
+        offset = strings.get(data)
+        if offset is None:
+            offset = strings[data] = len(pool)
+            pool.extend(data)
+        return offset, len(data)
+
+    year_table = bytearray()
+    record_table = bytearray()
+    count = 0
+    for year in sorted(years):
+        year_mtime, student_dirs = years[year]
+        year_table += YEAR.pack(year, _optional(year_mtime), count, len(student_dirs))
+        for student_dir in sorted(student_dirs):
+            student_id = f"{year}_{student_dir}"
+            signature = signatures.get(student_id)
+            record = records.get(student_id)
+            flags = 0
+            info_mtime = info_size = code_mtime = -1
+            if signature is not None:
+                flags |= HAS_SIGNATURE
+                info_mtime, info_size, code_mtime = signature
+                if code_mtime is not None:
+                    flags |= HAS_CODE_MTIME
+                code_mtime = _optional(code_mtime)
+            body_offset = body_length = 0
+            if record is not None:
+                flags |= HAS_RECORD
+                body_offset, body_length = intern(
+                    json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                )
+            dir_offset, dir_length = intern(student_dir.encode('utf-8'))
+            record_table += RECORD.pack(
+                dir_offset, dir_length, body_offset, body_length,
+                flags, info_mtime, info_size, code_mtime
+            )
+            count += 1
+
+    header = HEADER.pack(MAGIC, VERSION, len(years), count, _optional(root_mtime))
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            f.write(year_table)
+            f.write(record_table)
+            f.write(pool)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога, открытый только для чтения через mmap
+    """
+
+    def __init__(self, path: Path):
+        try:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Не удалось открыть снимок {path}: {e}") from e
+
+        try:
+            magic, version, self.year_count, self.record_count, root_mtime = HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SnapshotError(f"Неподдерживаемый формат снимка {path}")
+
+        self.root_mtime = None if root_mtime == -1 else root_mtime
+        self._years_offset = HEADER.size
+        self._records_offset = self._years_offset + YEAR.size * self.year_count
+        self._pool_offset = self._records_offset + RECORD.size * self.record_count
+        if self._pool_offset > len(self._map):
+            self.close()
+            raise SnapshotError(f"Снимок {path} поврежден")
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> 'CatalogSnapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._pool_offset + offset
+        return self._map[start:start + length]
+
+    def _year(self, index: int) -> Tuple[int, Optional[int], int, int]:
+        year, mtime, first, count = YEAR.unpack_from(self._map, self._years_offset + YEAR.size * index)
+        return year, None if mtime == -1 else mtime, first, count
+
+    def _record(self, index: int) -> Tuple[str, Optional[Signature], Optional[Dict[str, Any]]]:
+        (dir_offset, dir_length, body_offset, body_length,
+         flags, info_mtime, info_size, code_mtime) = RECORD.unpack_from(
+            self._map, self._records_offset + RECORD.size * index
+        )
+        student_dir = self._string(dir_offset, dir_length).decode('utf-8')
+        signature = None
+        if flags & HAS_SIGNATURE:
+            signature = (info_mtime, info_size, code_mtime if flags & HAS_CODE_MTIME else None)
+        record = None
+        if flags & HAS_RECORD:
+            record = json.loads(self._string(body_offset, body_length))
+        return student_dir, signature, record
+
+    def years(self) -> Iterator[Tuple[int, Optional[int]]]:
+        """
+        Годы и время модификации их директорий
+        """
+        for index in range(self.year_count):
+            year, mtime, _, _ = self._year(index)
+            yield year, mtime
+
+    def students(self, year: int) -> Iterator[Tuple[str, Optional[Signature], Optional[Dict[str, Any]]]]:
+        """
+        Директории студентов года: (директория, сигнатура, запись или None)
+        """
+        index = self._find_year(year)
+        if index is None:
+            return
+        _, _, first, count = self._year(index)
+        for record_index in range(first, first + count):
+            yield self._record(record_index)
+
+    def _find_year(self, year: int) -> Optional[int]:
+        low, high = 0, self.year_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._year(middle)[0] < year:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.year_count and self._year(low)[0] == year:
+            return low
+        return None
+
+
+if __name__ == '__main__':
+    # Сборка снимка: python -m app.services.catalog_snapshot [data] [файл снимка]
+    import sys
+
+    from .catalog import StudentCatalog
+
+    data_path = Path(sys.argv[1] if len(sys.argv) > 1 else "data")
+    snapshot_path = Path(sys.argv[2] if len(sys.argv) > 2 else ".catalog_snapshot")
+    catalog = StudentCatalog(data_path, snapshot_path=snapshot_path)
+    # Принудительное обновление перечитывает все директории
+    catalog.refresh(force=True)
+    catalog.save_snapshot()
+    print(f"Снимок {snapshot_path}: {len(catalog)} студентов")
@@ -0,0 +1,304 @@
+"""
+Наблюдение за директорией данных и инкрементальное обновление каталога
+
+Фоновый поток следит за data/, директориями годов, студентов и их code/
+через inotify (вызовы libc через ctypes) и после паузы в событиях
+перечитывает только затронутые директории. Пока наблюдатель работает,
+запросы не обращаются к файловой системе: каталог и его индексы
+обновляются этим потоком под блокировкой каталога. Если inotify
+недоступен (не Linux, исчерпан лимит наблюдений - в том числе позже,
+при появлении новых директорий), каталог периодически синхронизируется
+по stat из того же потока.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from .catalog import StudentCatalog
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+# wd, mask, cookie, длина имени
+EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    """
+    Минимальная обертка над inotify
+    """
+
+    def __init__(self):
+        library = ctypes.util.find_library('c')
+        if library is None:
+            raise OSError("libc не найдена")
+        self._libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify не поддерживается")
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read(self, timeout: float):
+        """
+        События (wd, mask, имя), дождавшись их не дольше timeout секунд
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class CatalogWatcher:
+    """
+    Фоновое обновление каталога по событиям файловой системы
+    """
+
+    def __init__(self, catalog: StudentCatalog, debounce: float = 0.2, poll_interval: float = 2.0):
+        self.catalog = catalog
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None  # 'inotify' или 'polling'
+
+        self._inotify: Optional[Inotify] = None
+        self._paths: Dict[int, Path] = {}
+        self._watched: Set[Path] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Накопленные изменения: весь каталог, годы, директории студентов
+        self._rescan = False
+        self._years: Set[int] = set()
+        self._students: Set[Tuple[int, str]] = set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.catalog.refresh()
+        try:
+            self._inotify = Inotify()
+            self.mode = 'inotify'
+            self._watch_new(*self._watch_tree())
+        except OSError as e:
+            self._fall_back(e)
+        # Каталог больше не проверяет файловую систему при чтении
+        self.catalog.watched = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.catalog.watched = False
+        self._close_inotify()
+        self.mode = None
+
+    def _fall_back(self, error: OSError) -> None:
+        """
+        Переход на опрос: без наблюдения за всеми директориями события
+        о части изменений не придут
+        """
+        print(f"inotify недоступен ({error}), каталог обновляется опросом")
+        self._close_inotify()
+        self.mode = 'polling'
+        self.catalog.rescan()
+
+    def _close_inotify(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._paths.clear()
+        self._watched.clear()
+
+    # --- Наблюдения -------------------------------------------------------
+
+    def _watch(self, path: Path) -> bool:
+        """
+        Добавление наблюдения; True, если оно добавлено только что. Прочие
+        ошибки OSError (например, ENOSPC - исчерпан лимит наблюдений)
+        передаются вызывающему.
+        """
+        if path in self._watched:
+            return False
+        try:
+            wd = self._inotify.add_watch(path, WATCH_MASK)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        self._paths[wd] = path
+        self._watched.add(path)
+        return True
+
+    def _watch_tree(self, years: Optional[Set[int]] = None,
+                    students: Optional[Set[Tuple[int, str]]] = None
+                    ) -> Tuple[Set[int], Set[Tuple[int, str]]]:
+        """
+        Наблюдения за директориями, известными каталогу: за всеми или только
+        за указанными годами и директориями студентов. Возвращает годы и
+        директории студентов, наблюдение за которыми добавлено только что.
+        """
+        data_path = self.catalog.data_path
+        self._watch(data_path)
+        with self.catalog.lock:
+            layout = self.catalog.layout()
+        new_years: Set[int] = set()
+        new_students: Set[Tuple[int, str]] = set()
+        for year, student_dirs in layout.items():
+            if years is not None and year not in years:
+                student_dirs = [d for d in student_dirs if (year, d) in (students or ())]
+            elif self._watch(data_path / str(year)):
+                new_years.add(year)
+            for student_dir in student_dirs:
+                student_path = data_path / str(year) / student_dir
+                if self._watch(student_path) | self._watch(student_path / "code"):
+                    new_students.add((year, student_dir))
+        return new_years, new_students
+
+    def _watch_new(self, years: Set[int], students: Set[Tuple[int, str]]) -> None:
+        """
+        Повторная проверка директорий, наблюдение за которыми только что
+        добавлено: изменения между их чтением и добавлением наблюдения
+        (например, info.json, созданный сразу после новой директории)
+        событий не дали. Найденные при этом директории также наблюдаются.
+        """
+        while years or students:
+            self.catalog.update(years, students)
+            years, students = self._watch_tree(years, students)
+
+    def _classify(self, path: Path, name: str) -> None:
+        """
+        Запоминание изменения по пути директории и имени из события
+        """
+        try:
+            parts = path.relative_to(self.catalog.data_path).parts
+        except ValueError:
+            return
+        if not parts:
+            if name.isdigit():
+                self._years.add(int(name))
+            return
+        if not parts[0].isdigit():
+            return
+        year = int(parts[0])
+        if len(parts) == 1:
+            if name:
+                self._students.add((year, name))
+            else:
+                self._years.add(year)
+        else:
+            self._students.add((year, parts[1]))
+
+    # --- Поток ------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._inotify is None:
+                    if not self._stop.wait(self.poll_interval):
+                        self.catalog.rescan()
+                    continue
+                if self._collect():
+                    self._apply()
+            except Exception as e:
+                print(f"Ошибка обновления каталога: {e}")
+                time.sleep(self.poll_interval)
+
+    def _collect(self) -> bool:
+        """
+        Ожидание событий; возвращает True, когда после последнего события
+        прошло debounce секунд
+        """
+        pending = False
+        timeout = 0.5
+        while not self._stop.is_set():
+            events = self._inotify.read(timeout)
+            if not events:
+                return pending
+            pending = True
+            timeout = self.debounce
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    self._rescan = True
+                    continue
+                path = self._paths.get(wd)
+                if path is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # Директория удалена, наблюдение снято ядром
+                    del self._paths[wd]
+                    self._watched.discard(path)
+                self._classify(path, '' if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED) else name)
+        return False
+
+    def _apply(self) -> None:
+        rescan, years, students = self._rescan, self._years, self._students
+        self._rescan, self._years, self._students = False, set(), set()
+        if rescan:
+            self.catalog.rescan()
+        else:
+            self.catalog.update(years, students)
+        try:
+            if rescan:
+                self._watch_new(*self._watch_tree())
+            else:
+                self._watch_new(*self._watch_tree(years, students))
+        except OSError as e:
+            self._fall_back(e)
+
+
+_watchers: Dict[int, CatalogWatcher] = {}
+
+
+def watch_catalog(catalog: StudentCatalog, debounce: float, poll_interval: float) -> CatalogWatcher:
+    """
+    Запуск наблюдателя для каталога (один на каталог)
+    """
+    watcher = _watchers.get(id(catalog))
+    if watcher is None:
+        watcher = _watchers[id(catalog)] = CatalogWatcher(catalog, debounce, poll_interval)
+    watcher.start()
+    return watcher
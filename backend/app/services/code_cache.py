@@ -0,0 +1,119 @@
+import os
+import marshal
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .cache import TTLCache
+
+
+class CompiledCode:
+    """
+    Source of a student's code file together with its compiled module.
+
+    The module is compiled (and marshalled for sending to the workers) at
+    most once, on first use.
+    """
+
+    __slots__ = ('filename', 'source', 'digest', '_bytecode', '_error', '_lock')
+
+    def __init__(self, source: str, filename: str):
+        self.filename = filename
+        self.source = source
+        self.digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        self._bytecode: Optional[bytes] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _compile(self) -> None:
+        with self._lock:
+            if self._bytecode is not None or self._error is not None:
+                return
+            try:
+                self._bytecode = marshal.dumps(compile(self.source, self.filename, 'exec'))
+            except (SyntaxError, ValueError) as e:
+                self._error = str(e)
+
+    @property
+    def bytecode(self) -> Optional[bytes]:
+        """Marshalled code object, or None if the source does not compile"""
+        self._compile()
+        return self._bytecode
+
+    @property
+    def error(self) -> Optional[str]:
+        """Compilation error message, if any"""
+        self._compile()
+        return self._error
+
+
+class CodeCache:
+    """
+    Cache of code files keyed by path and validated by mtime and size.
+
+    Repeated executions of the same file neither re-read it from disk nor
+    re-compile it; an edited file is picked up on the next request.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self._files = TTLCache(max_entries=max_entries)
+        self._sources = TTLCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def load(self, path: Path) -> Optional[CompiledCode]:
+        """Code file at path, or None if it does not exist or is unreadable"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = str(path)
+        entry = self._files.get(key)
+        if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+            self._count(True)
+            return entry[1]
+        self._count(False)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        compiled = CompiledCode(source, path.name)
+        self._files.set(key, ((stat.st_mtime_ns, stat.st_size), compiled))
+        return compiled
+
+    def from_source(self, source: str, filename: str = '<string>') -> CompiledCode:
+        """Compiled code for a source string, shared between identical sources"""
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        compiled = self._sources.get((digest, filename))
+        self._count(compiled is not None)
+        if compiled is None:
+            compiled = CompiledCode(source, filename)
+            self._sources.set((digest, filename), compiled)
+        return compiled
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._files) + len(self._sources),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Global code cache instance
+code_cache = CodeCache()
@@ -1,11 +1,17 @@
-import sys
-import io
 import time
 import threading
-from contextlib import redirect_stdout, redirect_stderr
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-from typing import Dict, Any, Optional, Tuple
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 from ..core.config import settings
+from ..schemas.thesis import ExecutionResult, ExecutionStats
+from .arguments import parse_args
+from .cache import TTLCache
+from .code_cache import CompiledCode, code_cache
+from .figures import figure_store
+from .metrics import metrics
+from .worker_pool import (
+    ExecutionCancelledError, PoolBusyError, WorkerCrashedError, WorkerPool, WorkerTimeoutError
+)
 
 
 class CodeTimeoutError(Exception):
@@ -13,7 +19,12 @@ class CodeTimeoutError(Exception):
 
 
 class SafePythonExecutor:
-    """Simple and safe Python code executor with basic restrictions"""
+    """
+    Simple and safe Python code executor with basic restrictions.
+    
+    Code runs in a pool of pre-warmed worker processes (see WorkerPool),
+    so executions do not block the API process and run in parallel.
+    """
     
     ALLOWED_BUILTINS = {
         'abs', 'all', 'any', 'bin', 'bool', 'chr', 'dict', 'divmod',
@@ -28,93 +39,352 @@ class SafePythonExecutor:
     }
     
     ALLOWED_MODULES = {
-        'math', 'statistics', 'random', 'datetime', 'json', 'numpy', 'pandas'
+        'math', 'statistics', 'random', 'datetime', 'json', 'numpy', 'pandas',
+        'matplotlib.pyplot'
     }
     
     def __init__(self):
-        self.restricted_builtins = {
-            name: builtin for name, builtin in __builtins__.items()
-            if name in self.ALLOWED_BUILTINS
-        }
+        self.pool = WorkerPool(
+            size=settings.executor_pool_size,
+            allowed_modules=sorted(self.ALLOWED_MODULES),
+            allowed_builtins=sorted(self.ALLOWED_BUILTINS),
+            memory_limit_mb=settings.code_execution_memory_limit
+        )
+        # Results of deterministic (seeded) runs, see execute_code, stored
+        # as (result, printed): the result text is the run's stdout if
+        # printed is set and a placeholder otherwise. Batch jobs store the
+        # list of their calls' results instead (see _execute_batch).
+        self.result_cache = TTLCache(
+            max_entries=settings.execution_cache_size,
+            ttl=settings.execution_cache_ttl,
+            max_size=settings.execution_cache_max_bytes,
+            sizeof=self._cached_size
+        )
+    
+    def start(self) -> None:
+        """Start the worker processes (imports happen once, here)"""
+        self.pool.start()
+    
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+    
+    @staticmethod
+    def _cached_size(entry: tuple) -> int:
+        results = entry[0] if isinstance(entry[0], list) else [entry[0]]
+        return sum(len(result.result or '') for result in results)
+    
+    def _cache_key(self, compiled: CompiledCode, parsed_args: list, seed: Optional[int]) -> tuple:
+        """Cache key: hash of the code, the parsed arguments and the random seed"""
+        return (compiled.digest, repr(parsed_args), seed)
+    
+    def execute_code(self, code: str, args: Optional[str] = None, seed: Optional[int] = None,
+                     use_cache: bool = False) -> ExecutionResult:
+        """Execute a Python source string (see _execute)"""
+        return self._execute(code_cache.from_source(code), args, seed, use_cache)
     
-    def _execute_code_worker(self, code: str, safe_globals: dict) -> Tuple[str, str]:
-        """Worker function to execute code in a separate thread"""
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
+    def execute_file(self, path: Path, args: Optional[str] = None, seed: Optional[int] = None,
+                     use_cache: bool = False, profile: bool = False,
+                     cancel_event: Optional[threading.Event] = None,
+                     on_output: Optional[Callable[[str], None]] = None) -> Optional[ExecutionResult]:
+        """
+        Execute a code file; it is read and compiled once per modification
+        (see CodeCache). Returns None if the file does not exist.
+        """
+        compiled = code_cache.load(path)
+        if compiled is None:
+            return None
+        return self._execute(compiled, args, seed, use_cache, cancel_event, on_output, profile)
+    
+    def _execute(self, compiled: CompiledCode, args: Optional[str], seed: Optional[int],
+                 use_cache: bool, cancel_event: Optional[threading.Event] = None,
+                 on_output: Optional[Callable[[str], None]] = None,
+                 profile: bool = False) -> ExecutionResult:
+        """
+        Execute Python code safely with restrictions
+        
+        When use_cache is set, the random generators are seeded (with
+        settings.execution_cache_seed unless a seed is given) so the run is
+        deterministic, and a successful result is cached. A changed code
+        file hashes differently, so stale entries are never served.
+        Setting cancel_event stops a running execution.
+        
+        With on_output, stdout is passed to it while the code runs and is
+        not part of the returned result; the streamed chunks are still
+        collected (the worker bounds them by max_output_size) for the cache.
         
-        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-            exec(code, safe_globals)
+        With profile, the run is profiled in the worker and the result
+        carries an ExecutionProfile; such runs always execute and are not
+        cached.
+        """
+        if len(compiled.source) > settings.max_code_length:
+            return ExecutionResult(
+                success=False,
+                error=f"Code too long (max {settings.max_code_length} characters)",
+                execution_time=0.0
+            )
+        
+        # Parse arguments if provided
+        try:
+            parsed_args = parse_args(args)
+        except Exception as e:
+            return ExecutionResult(success=False, error=f"Error parsing arguments: {str(e)}", execution_time=0.0)
+        
+        cache_key = None
+        if use_cache and not profile:
+            if seed is None:
+                seed = settings.execution_cache_seed
+            cache_key = self._cache_key(compiled, parsed_args, seed)
+            lookup_start = time.perf_counter()
+            cached, printed = self.result_cache.get(cache_key, (None, False))
+            if cached is not None and figure_store.has_all(cached.figures):
+                hit = self._cache_hit(lookup_start)
+                if on_output is not None and printed:
+                    # Only real output is streamed; without it the result
+                    # keeps its placeholder text
+                    on_output(cached.result)
+                    return cached.model_copy(update=dict(hit, result=None))
+                return cached.model_copy(update=hit)
+        
+        start_time = time.time()
+        
+        # The first access compiles the code, later ones are free
+        compile_start = time.perf_counter()
+        if compiled.error is not None:
+            return ExecutionResult(success=False, error=compiled.error, execution_time=time.time() - start_time)
+        compile_time = time.perf_counter() - compile_start
+        
+        streamed: List[str] = []
+        stream = on_output
+        if on_output is not None and cache_key is not None:
+            def stream(text: str) -> None:
+                streamed.append(text)
+                on_output(text)
+        
+        try:
+            # The worker runs the module and then auto-executes main(*args)
+            result = self.pool.run(
+                {
+                    'bytecode': compiled.bytecode,
+                    'digest': compiled.digest,
+                    'args': parsed_args,
+                    'seed': seed,
+                    'max_output': settings.max_output_size,
+                    'profile': settings.profile_top_n if profile else None,
+                    'figures': self._figure_options()
+                },
+                timeout=settings.code_execution_timeout,
+                cancel_event=cancel_event,
+                on_output=stream
+            )
+            execution_time = time.time() - start_time
+            metrics.increment('worker_code_cache_hits' if result.get('code_cache_hit') else 'worker_code_cache_misses')
+            
+            if on_output is not None and result['error'] is None and not result['stderr']:
+                # Only the truncation note, if any, was not streamed yet
+                if result['stdout']:
+                    on_output(result['stdout'])
+                execution_result = ExecutionResult(success=True, execution_time=execution_time,
+                                                   profile=result.get('profile'),
+                                                   figures=self._store_figures(result),
+                                                   stats=self._make_stats(result, compile_time))
+                if cache_key is not None:
+                    stdout = ''.join(streamed) + result['stdout']
+                    self.result_cache.set(cache_key, (
+                        execution_result.model_copy(update={'result': stdout or "Code executed successfully"}),
+                        bool(stdout)
+                    ))
+                return execution_result
+            
+            execution_result = self._make_result(result, execution_time, compile_time)
+            if cache_key is not None and execution_result.success:
+                self.result_cache.set(cache_key, (execution_result, bool(result['stdout'])))
+            return execution_result
+            
+        except Exception as e:
+            error = self._run_error(e)
         
-        return stdout_capture.getvalue(), stderr_capture.getvalue()
+        return ExecutionResult(success=False, error=error, execution_time=time.time() - start_time)
     
-    def execute_code(self, code: str, args: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str], float]:
+    def execute_batch_file(self, path: Path, args_list: List[Optional[str]],
+                           indices: Optional[List[int]] = None, seed: Optional[int] = None,
+                           use_cache: bool = False, cancel_event: Optional[threading.Event] = None,
+                           on_result: Optional[Callable[[int, ExecutionResult], None]] = None
+                           ) -> Optional[ExecutionResult]:
         """
-        Execute Python code safely with restrictions
+        Execute a code file once per argument set (see _execute_batch).
+        Returns None if the file does not exist.
+        """
+        compiled = code_cache.load(path)
+        if compiled is None:
+            return None
+        return self._execute_batch(compiled, args_list, indices, seed, use_cache, cancel_event, on_result)
+    
+    def _execute_batch(self, compiled: CompiledCode, args_list: List[Optional[str]],
+                       indices: Optional[List[int]], seed: Optional[int], use_cache: bool,
+                       cancel_event: Optional[threading.Event] = None,
+                       on_result: Optional[Callable[[int, ExecutionResult], None]] = None
+                       ) -> ExecutionResult:
+        """
+        Call main(*args) for every argument set on one worker, which runs
+        the module body only once; the calls share the module's globals.
         
-        Returns:
-            Tuple of (success, result, error, execution_time)
+        Each call's result is passed to on_result(index, result) as soon as
+        it is ready, where indices are the positions of the argument sets in
+        the caller's batch (0..n-1 by default). Returns a summary of the
+        whole batch.
+        
+        As a call can see globals left by the calls before it, caching
+        works per job: the results of all calls are cached together, keyed
+        by the whole ordered list of arguments, when every call succeeded.
         """
-        if len(code) > settings.max_code_length:
-            return False, None, f"Code too long (max {settings.max_code_length} characters)", 0.0
+        if indices is None:
+            indices = list(range(len(args_list)))
+        outcomes: Dict[int, bool] = {}
         
-        # Prepare execution environment
-        safe_globals = {
-            '__builtins__': self.restricted_builtins,
-            '__name__': '__main__',
-        }
+        def deliver(index: int, result: ExecutionResult) -> None:
+            outcomes[index] = result.success
+            if on_result is not None:
+                on_result(index, result)
+        
+        start_time = time.time()
+        compile_start = time.perf_counter()
+        error = compiled.error
+        compile_time = time.perf_counter() - compile_start
+        stats = None
+        if len(compiled.source) > settings.max_code_length:
+            error = f"Code too long (max {settings.max_code_length} characters)"
+        if use_cache and seed is None:
+            seed = settings.execution_cache_seed
         
-        # Add allowed modules
-        for module_name in self.ALLOWED_MODULES:
+        pending = []
+        for index, args in zip(indices, args_list):
             try:
-                safe_globals[module_name] = __import__(module_name)
-            except ImportError:
-                pass
+                parsed_args = parse_args(args)
+            except Exception as e:
+                deliver(index, ExecutionResult(success=False, error=f"Error parsing arguments: {str(e)}",
+                                               execution_time=0.0))
+                continue
+            pending.append((index, parsed_args))
         
-        # Parse arguments if provided
-        parsed_args = []
-        if args:
+        cache_key = None
+        if use_cache and error is None and pending:
+            cache_key = self._cache_key(compiled, [args for _, args in pending], seed) + ('batch',)
+            lookup_start = time.perf_counter()
+            cached, _ = self.result_cache.get(cache_key, (None, None))
+            if cached is not None and all(figure_store.has_all(result.figures) for result in cached):
+                hit = self._cache_hit(lookup_start)
+                for (index, _), result in zip(pending, cached):
+                    deliver(index, result.model_copy(update=hit))
+                pending = []
+        
+        point_results: List[ExecutionResult] = []
+        
+        def on_point(index: int, raw: Dict) -> None:
+            result = self._make_result(raw, raw['time'])
+            point_results.append(result)
+            deliver(index, result)
+        
+        if pending and error is None:
             try:
-                # Simple argument parsing - expect comma-separated values
-                for arg in args.split(','):
-                    arg = arg.strip()
-                    if arg.isdigit():
-                        parsed_args.append(int(arg))
-                    elif arg.replace('.', '').isdigit():
-                        parsed_args.append(float(arg))
-                    else:
-                        parsed_args.append(arg.strip('"\''))
-                safe_globals['args'] = parsed_args
+                result = self.pool.run(
+                    {
+                        'bytecode': compiled.bytecode,
+                        'digest': compiled.digest,
+                        'batch': pending,
+                        'seed': seed,
+                        'max_output': settings.max_output_size,
+                        'point_time_limit': settings.code_execution_timeout,
+                        'figures': self._figure_options()
+                    },
+                    timeout=settings.code_execution_timeout * (len(pending) + 1),
+                    cancel_event=cancel_event,
+                    on_point=on_point
+                )
+                metrics.increment('worker_code_cache_hits' if result.get('code_cache_hit') else 'worker_code_cache_misses')
+                stats = self._make_stats(result, compile_time)
+                if (cache_key is not None and len(point_results) == len(pending)
+                        and all(point.success for point in point_results)):
+                    self.result_cache.set(cache_key, (point_results, None))
             except Exception as e:
-                return False, None, f"Error parsing arguments: {str(e)}", 0.0
-        else:
-            safe_globals['args'] = []
+                error = self._run_error(e)
         
-        start_time = time.time()
+        # Calls that never ran share the error that stopped the batch
+        for index, _ in pending:
+            if index not in outcomes:
+                deliver(index, ExecutionResult(success=False, error=error, execution_time=0.0))
         
-        try:
-            # Use ThreadPoolExecutor for timeout handling
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                # Add code to call main function if it exists
-                enhanced_code = code + "\n\n# Auto-execute main function if it exists\ntry:\n    if 'main' in globals() and callable(main):\n        main(*args)\nexcept NameError:\n    pass\n"
-                
-                future = executor.submit(self._execute_code_worker, enhanced_code, safe_globals)
-                
-                try:
-                    stdout_result, stderr_result = future.result(timeout=settings.code_execution_timeout)
-                    execution_time = time.time() - start_time
-                    
-                    if stderr_result:
-                        return False, None, stderr_result, execution_time
-                    
-                    return True, stdout_result or "Code executed successfully", None, execution_time
-                    
-                except FutureTimeoutError:
-                    execution_time = time.time() - start_time
-                    return False, None, f"Code execution timed out after {settings.code_execution_timeout} seconds", execution_time
-                    
-        except Exception as e:
-            execution_time = time.time() - start_time
-            return False, None, str(e), execution_time
+        succeeded = sum(outcomes.values())
+        return ExecutionResult(
+            success=succeeded == len(outcomes),
+            result=f"{succeeded} of {len(outcomes)} runs succeeded",
+            error=error,
+            execution_time=time.time() - start_time,
+            stats=stats
+        )
+    
+    def _cache_hit(self, lookup_start: float) -> Dict:
+        """
+        Fields replaced in a cached result: the stored timings and stats
+        belong to the original run, not to this request
+        """
+        return {'cached': True, 'execution_time': time.perf_counter() - lookup_start, 'stats': None}
+    
+    def _make_stats(self, result: Dict, compile_time: float = 0.0) -> Optional[ExecutionStats]:
+        """Stage timings and resource usage of a run reported by a worker"""
+        stats = result.get('stats')
+        if stats is None:
+            return None
+        return ExecutionStats(
+            compile=compile_time + stats['load'],
+            setup=stats['setup'],
+            run=stats['run'],
+            render=stats['render'],
+            serialization=max(time.monotonic() - stats['finished'], 0.0),
+            cpu_time=stats['cpu_time'],
+            peak_rss=stats['peak_rss']
+        )
+    
+    def _make_result(self, result: Dict, execution_time: float, compile_time: float = 0.0) -> ExecutionResult:
+        """ExecutionResult of a run reported by a worker"""
+        details = {
+            'profile': result.get('profile'),
+            'figures': self._store_figures(result),
+            'stats': self._make_stats(result, compile_time),
+        }
+        if result['error'] is not None:
+            return ExecutionResult(success=False, error=result['error'], execution_time=execution_time,
+                                   **details)
+        
+        if result['stderr']:
+            return ExecutionResult(success=False, error=result['stderr'], execution_time=execution_time,
+                                   **details)
+        
+        return ExecutionResult(
+            success=True,
+            result=result['stdout'] or "Code executed successfully",
+            execution_time=execution_time,
+            **details
+        )
+    
+    def _figure_options(self) -> tuple:
+        """How workers render figures: format, dpi and maximum count"""
+        return (settings.figure_format, settings.figure_dpi, settings.max_figures)
+    
+    def _store_figures(self, result: Dict) -> List[str]:
+        """Put the figures rendered by a worker into the figure store"""
+        return [figure_store.put(image, settings.figure_format) for image in result.get('figures', [])]
+    
+    def _run_error(self, error: Exception) -> str:
+        """Error message for a run that failed in the pool"""
+        if isinstance(error, WorkerTimeoutError):
+            return f"Code execution timed out after {settings.code_execution_timeout} seconds"
+        if isinstance(error, PoolBusyError):
+            return "All code execution workers are busy, try again later"
+        if isinstance(error, ExecutionCancelledError):
+            return "Code execution was cancelled"
+        if isinstance(error, WorkerCrashedError):
+            return "Code execution was terminated (resource limit exceeded)"
+        return str(error)
 
 
 # Global executor instance
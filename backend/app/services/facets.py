@@ -0,0 +1,118 @@
+"""
+Фасетный индекс каталога студентов
+
+Для каждого значения фасета (год, научный руководитель, ключевое слово,
+наличие кода) хранится множество ID студентов. Фильтрация - пересечение
+множеств, подсчет - размеры пересечений.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+FACETS = ('year', 'advisor', 'keyword', 'has_code')
+
+
+def facet_values(student_id: str, record: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Значения фасетов записи студента
+    """
+    thesis = record.get('thesis', {}) or {}
+    advisor = thesis.get('advisor')
+    return {
+        'year': [int(student_id.split('_', 1)[0])],
+        'advisor': [advisor] if advisor else [],
+        'keyword': sorted({k for k in thesis.get('keywords', []) or [] if k}),
+        'has_code': [bool(record.get('code', {}).get('has_code', False))],
+    }
+
+
+class FacetIndex:
+    """
+    Списки вхождений по значениям фасетов, обновляемые вместе с каталогом
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {facet: {} for facet in FACETS}
+        self._doc_values: Dict[str, Dict[str, List[Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_values)
+
+    def add(self, student_id: str, record: Dict[str, Any]) -> None:
+        self.remove(student_id)
+        values = facet_values(student_id, record)
+        for facet, facet_vals in values.items():
+            postings = self._postings[facet]
+            for value in facet_vals:
+                postings.setdefault(value, set()).add(student_id)
+        self._doc_values[student_id] = values
+
+    def remove(self, student_id: str) -> None:
+        values = self._doc_values.pop(student_id, None)
+        if values is None:
+            return
+        for facet, facet_vals in values.items():
+            postings = self._postings[facet]
+            for value in facet_vals:
+                docs = postings[value]
+                docs.discard(student_id)
+                if not docs:
+                    del postings[value]
+
+    def match(self, filters: Dict[str, Any], exclude: Optional[str] = None) -> Optional[Set[str]]:
+        """
+        Множество студентов, удовлетворяющих всем фильтрам (кроме exclude)
+
+        None означает отсутствие ограничений (подходят все студенты).
+        """
+        sets = [
+            self._postings[facet].get(value, set())
+            for facet, value in filters.items()
+            if facet != exclude
+        ]
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for docs in sets[1:]:
+            result &= docs
+            if not result:
+                break
+        return result
+
+    def _counts(self, facet: str, docs: Optional[Set[str]]) -> Dict[Any, int]:
+        postings = self._postings[facet]
+        if docs is None:
+            return {value: len(ids) for value, ids in postings.items()}
+        if len(docs) < len(postings):
+            # Мало документов - считаем по значениям самих документов
+            counts: Dict[Any, int] = {}
+            for student_id in docs:
+                for value in self._doc_values[student_id][facet]:
+                    counts[value] = counts.get(value, 0) + 1
+            return counts
+        return {
+            value: count for value, count in
+            ((value, len(ids & docs)) for value, ids in postings.items())
+            if count
+        }
+
+    def counts(self, filters: Dict[str, Any], candidates: Optional[Iterable[str]] = None,
+               limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Количество студентов по значениям каждого фасета.
+
+        candidates ограничивает выборку (например, результатами поиска).
+        Для каждого фасета учитываются фильтры по остальным фасетам, чтобы
+        при выбранном значении оставались видны альтернативы.
+        """
+        base = set(candidates) if candidates is not None else None
+        result = {}
+        for facet in FACETS:
+            docs = self.match(filters, exclude=facet)
+            if base is not None:
+                docs = base if docs is None else base & docs
+            counts = sorted(self._counts(facet, docs).items(), key=lambda item: (-item[1], str(item[0])))
+            if limit is not None:
+                counts = counts[:limit]
+            result[facet] = [{'value': value, 'count': count} for value, count in counts]
+        return result
@@ -0,0 +1,137 @@
+import os
+import re
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+
+MEDIA_TYPES = {'png': 'image/png', 'webp': 'image/webp'}
+_FIGURE_ID = re.compile(r'[0-9a-f]{64}\.(png|webp)')
+
+
+class FigureStore:
+    """
+    Content-addressed store of figures rendered by executions.
+
+    A figure's id is the SHA-256 of its image plus the format extension,
+    so identical figures are stored once and an id never changes meaning
+    (responses can be cached forever).
+
+    Figures are files in a directory shared by all API processes, so a
+    figure rendered by one uvicorn worker is served by any other. The
+    directory is bounded by the number of figures and their total size;
+    the least recently used ones (by file mtime, which reads refresh) are
+    deleted first.
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, figure_id: str) -> Optional[Path]:
+        if not _FIGURE_ID.fullmatch(figure_id):
+            return None
+        return self.path / figure_id
+
+    def put(self, image: bytes, figure_format: str) -> str:
+        figure_id = f"{hashlib.sha256(image).hexdigest()}.{figure_format}"
+        if len(image) > self.max_bytes:
+            return figure_id
+        path = self.path / figure_id
+        try:
+            os.utime(path)
+            return figure_id
+        except FileNotFoundError:
+            pass
+        temp_path = self.path / f".{figure_id}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            temp_path.write_bytes(image)
+            # Readers in other processes see either no file or the whole image
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Failed to store figure {figure_id}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return figure_id
+        self._prune()
+        return figure_id
+
+    def get(self, figure_id: str) -> Optional[bytes]:
+        path = self._file(figure_id)
+        image = None
+        if path is not None:
+            try:
+                image = path.read_bytes()
+                # Marks the figure as recently used
+                os.utime(path)
+            except OSError:
+                pass
+        if image is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return image
+
+    def has_all(self, figure_ids: Iterable[str]) -> bool:
+        """Whether all figures are still stored (a cached result may outlive them)"""
+        return all(
+            path is not None and path.is_file()
+            for path in map(self._file, figure_ids)
+        )
+
+    def media_type(self, figure_id: str) -> str:
+        return MEDIA_TYPES[figure_id.rsplit('.', 1)[1]]
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """Stored figures as (mtime, size, path), least recently used first"""
+        entries = []
+        try:
+            with os.scandir(self.path) as scan:
+                for entry in scan:
+                    if not _FIGURE_ID.fullmatch(entry.name):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        except OSError:
+            return []
+        entries.sort()
+        return entries
+
+    def _prune(self) -> None:
+        entries = self._entries()
+        count = len(entries)
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            # Another process may be pruning the same files
+            path.unlink(missing_ok=True)
+            count -= 1
+            size -= entry_size
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(entries),
+            'size': sum(entry[1] for entry in entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Global figure store instance
+figure_store = FigureStore(
+    path=Path(settings.figure_dir),
+    max_entries=settings.figure_cache_size,
+    max_bytes=settings.figure_cache_max_bytes
+)
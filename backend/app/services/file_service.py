@@ -2,11 +2,15 @@
 Сервис для работы с файловой системой данных студентов
 """
 
-import json
-import os
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+
+from ..core.config import settings
+from .catalog import get_catalog, load_student_record
+from .code_cache import CompiledCode, code_cache
+from .facets import FacetIndex
+from .search_index import SearchIndex, TrigramIndex
+from .statistics import CatalogStatistics
 
 class FileStudentService:
     """
@@ -17,197 +21,155 @@ class FileStudentService:
         self.data_path = Path(data_path)
         if not self.data_path.exists():
             self.data_path.mkdir(parents=True, exist_ok=True)
+        # Каталог общий для всех экземпляров сервиса в процессе; при
+        # холодном старте он заполняется из бинарного снимка
+        snapshot_path = Path(settings.catalog_snapshot_path) if settings.catalog_snapshot_path else None
+        self.catalog = get_catalog(
+            self.data_path, settings.catalog_refresh_interval,
+            snapshot_path, settings.catalog_snapshot_delay
+        )
+        self.search_index = self.catalog.attach('search', SearchIndex)
+        self.trigram_index = self.catalog.attach('trigram', TrigramIndex)
+        self.statistics = self.catalog.attach('statistics', CatalogStatistics)
+        self.facet_index = self.catalog.attach('facets', FacetIndex)
     
     def _load_student_info(self, year: int, student_dir: str) -> Optional[Dict[str, Any]]:
         """
-        Загрузка информации о студенте из файла info.json
+        Загрузка информации о студенте из файла info.json (минуя каталог)
         """
-        info_path = self.data_path / str(year) / student_dir / "info.json"
-        
-        if not info_path.exists():
-            return None
-        
-        try:
-            with open(info_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Добавляем дополнительную информацию
-            data['id'] = f"{year}_{student_dir}"
-            data['student_dir'] = student_dir
-            data['added_date'] = datetime.fromtimestamp(info_path.stat().st_mtime).isoformat()
-            
-            # Проверяем наличие кода
-            code_path = self.data_path / str(year) / student_dir / "code"
-            if code_path.exists() and data.get('code', {}).get('has_code', False):
-                data['code']['files'] = [f.name for f in code_path.iterdir() if f.is_file()]
-            
-            return data
-            
-        except (json.JSONDecodeError, KeyError, OSError) as e:
-            print(f"Ошибка загрузки данных студента {student_dir} ({year}): {e}")
-            return None
+        return load_student_record(self.data_path, year, student_dir)
     
     def get_all_students(self) -> List[Dict[str, Any]]:
         """
         Получение всех студентов из всех годов
         """
-        students = []
-        
-        # Проходим по всем годам
-        for year_dir in self.data_path.iterdir():
-            if not year_dir.is_dir() or not year_dir.name.isdigit():
-                continue
-                
-            year = int(year_dir.name)
-            
-            # Проходим по всем студентам в году
-            for student_dir in year_dir.iterdir():
-                if not student_dir.is_dir():
-                    continue
-                    
-                student_info = self._load_student_info(year, student_dir.name)
-                if student_info:
-                    students.append(student_info)
-        
-        # Сортируем по году выпуска и имени
-        students.sort(key=lambda x: (x['graduation_year'], x['name']))
-        return students
+        return self.catalog.all()
     
     def get_students_by_year(self, year: int) -> List[Dict[str, Any]]:
         """
         Получение студентов определенного года
         """
-        students = []
-        year_path = self.data_path / str(year)
-        
-        if not year_path.exists():
-            return students
-        
-        for student_dir in year_path.iterdir():
-            if not student_dir.is_dir():
-                continue
-                
-            student_info = self._load_student_info(year, student_dir.name)
-            if student_info:
-                students.append(student_info)
-        
-        # Сортируем по имени
-        students.sort(key=lambda x: x['name'])
-        return students
+        return self.catalog.by_year(year)
     
     def get_student_by_id(self, student_id: str) -> Optional[Dict[str, Any]]:
         """
         Получение студента по ID (формат: год_директория)
         """
-        try:
-            year_str, student_dir = student_id.split('_', 1)
-            year = int(year_str)
-            return self._load_student_info(year, student_dir)
-        except (ValueError, IndexError):
-            return None
+        return self.catalog.get(student_id)
+    
+    def _search_ids(self, query: str, match_all: bool, fuzzy: bool) -> List[str]:
+        """
+        ID студентов, найденных по запросу, в порядке релевантности
+        (вызывается под блокировкой каталога)
+        """
+        hits = self.search_index.search(query, match_all=match_all)
+        if not hits and fuzzy:
+            hits = self.trigram_index.search(query, settings.fuzzy_search_threshold)
+        return [student_id for student_id, _ in hits]
     
-    def search_students(self, query: str) -> List[Dict[str, Any]]:
+    def search_students(self, query: str, match_all: bool = True,
+                        fuzzy: bool = True) -> List[Dict[str, Any]]:
         """
-        Поиск студентов по запросу
+        Поиск студентов по запросу с ранжированием по релевантности
+        
+        match_all=True - все слова запроса (AND), иначе любое из них (OR).
+        Если полнотекстовый поиск ничего не нашел и fuzzy=True, выполняется
+        нечеткий поиск по имени и научному руководителю (опечатки).
         """
         if not query:
             return self.get_all_students()
         
-        query_lower = query.lower()
-        all_students = self.get_all_students()
-        results = []
+        with self.catalog.lock:
+            self.catalog.refresh()
+            records = [self.catalog.get(student_id) for student_id in self._search_ids(query, match_all, fuzzy)]
         
-        for student in all_students:
-            # Поиск по имени
-            if query_lower in student['name'].lower():
-                results.append(student)
-                continue
-            
-            # Поиск по названию работы
-            thesis_title = student.get('thesis', {}).get('title', '')
-            if query_lower in thesis_title.lower():
-                results.append(student)
-                continue
-            
-            # Поиск по аннотации
-            thesis_summary = student.get('thesis', {}).get('summary', '')
-            if query_lower in thesis_summary.lower():
-                results.append(student)
-                continue
+        return [record for record in records if record is not None]
+    
+    def find_students(self, query: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                      match_all: bool = True, fuzzy: bool = True,
+                      with_facets: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Поиск с фасетными фильтрами (year, advisor, keyword, has_code)
+        
+        Возвращает (студенты, количество по фасетам или None). Результаты
+        поиска упорядочены по релевантности, остальные - по году и имени.
+        """
+        filters = {facet: value for facet, value in (filters or {}).items() if value is not None}
+        
+        with self.catalog.lock:
+            self.catalog.refresh()
+            allowed = self.facet_index.match(filters)
             
-            # Поиск по ключевым словам
-            keywords = student.get('thesis', {}).get('keywords', [])
-            if any(query_lower in keyword.lower() for keyword in keywords):
-                results.append(student)
-                continue
+            if query:
+                candidates: Optional[List[str]] = self._search_ids(query, match_all, fuzzy)
+                ids = candidates if allowed is None else [i for i in candidates if i in allowed]
+                students = [self.catalog.get(student_id) for student_id in ids]
+            else:
+                candidates = None
+                if allowed is None:
+                    students = self.catalog.all()
+                elif list(filters) == ['year']:
+                    students = self.catalog.by_year(filters['year'])
+                else:
+                    students = [self.catalog.get(student_id) for student_id in allowed]
+                    students.sort(key=lambda x: (x['graduation_year'], x['name']))
             
-            # Поиск по научному руководителю
-            advisor = student.get('thesis', {}).get('advisor', '')
-            if query_lower in advisor.lower():
-                results.append(student)
-                continue
+            facets = None
+            if with_facets:
+                facets = self.facet_index.counts(filters, candidates, limit=settings.facet_limit)
         
-        return results
+        return [student for student in students if student is not None], facets
     
     def get_available_years(self) -> List[int]:
         """
         Получение списка доступных годов
         """
-        years = []
-        
-        for year_dir in self.data_path.iterdir():
-            if year_dir.is_dir() and year_dir.name.isdigit():
-                year = int(year_dir.name)
-                # Проверяем, что в году есть хотя бы один студент
-                if any(self._load_student_info(year, student_dir.name) 
-                       for student_dir in year_dir.iterdir() if student_dir.is_dir()):
-                    years.append(year)
-        
-        return sorted(years, reverse=True)
+        return self.catalog.years()
     
-    def get_student_code_file(self, student_id: str, filename: str) -> Optional[str]:
+    def get_year_counts(self) -> Dict[int, int]:
         """
-        Получение содержимого файла кода студента
+        Количество студентов по годам (из манифеста каталога)
+        """
+        return self.catalog.year_counts()
+    
+    def get_student_code_path(self, student_id: str, filename: str) -> Optional[Path]:
+        """
+        Путь к файлу кода студента (только внутри его директории code)
         """
         try:
             year_str, student_dir = student_id.split('_', 1)
             year = int(year_str)
-            
-            file_path = self.data_path / str(year) / student_dir / "code" / filename
-            
-            if not file_path.exists():
-                return None
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-                
-        except (ValueError, IndexError, OSError):
+        except (ValueError, IndexError):
+            return None
+        
+        code_dir = self.data_path / str(year) / student_dir / "code"
+        file_path = code_dir / filename
+        if file_path.parent != code_dir or filename in ('', '.', '..'):
             return None
+        return file_path
+    
+    def get_student_code(self, student_id: str, filename: str) -> Optional[CompiledCode]:
+        """
+        Файл кода студента вместе с хэшем его содержимого
+        """
+        file_path = self.get_student_code_path(student_id, filename)
+        if file_path is None:
+            return None
+        
+        # Файл перечитывается с диска только после изменения
+        return code_cache.load(file_path)
+    
+    def get_student_code_file(self, student_id: str, filename: str) -> Optional[str]:
+        """
+        Получение содержимого файла кода студента
+        """
+        compiled = self.get_student_code(student_id, filename)
+        return compiled.source if compiled is not None else None
     
     def get_statistics(self) -> Dict[str, Any]:
         """
         Получение статистики по базе данных
         """
-        all_students = self.get_all_students()
-        years = self.get_available_years()
-        
-        stats = {
-            'total_students': len(all_students),
-            'total_years': len(years),
-            'students_with_code': len([s for s in all_students if s.get('code', {}).get('has_code', False)]),
-            'years_range': {
-                'min': min(years) if years else None,
-                'max': max(years) if years else None
-            },
-            'by_year': {}
-        }
-        
-        # Статистика по годам
-        for year in years:
-            year_students = self.get_students_by_year(year)
-            stats['by_year'][year] = {
-                'count': len(year_students),
-                'with_code': len([s for s in year_students if s.get('code', {}).get('has_code', False)])
-            }
-        
-        return stats
\ No newline at end of file
+        with self.catalog.lock:
+            self.catalog.refresh()
+            return self.statistics.snapshot()
@@ -0,0 +1,247 @@
+import threading
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+from ..schemas.thesis import ExecutionResult
+from .cache import TTLCache
+from .metrics import SIZE_BUCKETS, metrics
+from .scheduler import FairScheduler, JobRejectedError, RateLimitError
+
+# Timings of ExecutionStats recorded as histograms
+STAGES = ('compile', 'setup', 'run', 'render', 'serialization', 'cpu_time')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+
+
+def _record_execution(student_id: str, queue_wait: float, result: ExecutionResult) -> None:
+    """Feed the timings and resource usage of a finished job into the metrics"""
+    metrics.observe('queue_wait', queue_wait, student_id)
+    if result.cached:
+        # Served from the result cache, nothing was executed
+        return
+    if result.execution_time is not None:
+        metrics.observe('execution_time', result.execution_time, student_id)
+    if result.stats is None:
+        return
+    for stage in STAGES:
+        metrics.observe(stage, getattr(result.stats, stage), student_id)
+    metrics.observe('peak_rss', result.stats.peak_rss, student_id, buckets=SIZE_BUCKETS)
+
+
+class Job:
+    """
+    One queued execution. task is called with the job's cancel_event and
+    returns an ExecutionResult (None if the code file is gone).
+    """
+
+    def __init__(self, student_id: str, task: Callable[..., Optional[ExecutionResult]],
+                 client_id: str = 'local', cost: int = 1):
+        self.id = uuid.uuid4().hex
+        self.student_id = student_id
+        # Who submitted the job (e.g. an IP address), for fair scheduling
+        self.client_id = client_id
+        # Executions the job stands for, charged to the client's rate limit
+        self.cost = cost
+        self.task = task
+        self.status = QUEUED
+        self.result: Optional[ExecutionResult] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.cancel_event = threading.Event()
+        # Resolved with the ExecutionResult when the job finishes
+        self.future: Future = Future()
+
+
+class JobManager:
+    """
+    Queue of execution jobs in front of the executor pool.
+
+    Submitting returns immediately; one dispatcher thread per pool worker
+    takes jobs from the FairScheduler, so at most pool-size jobs run at a
+    time and the rest wait here, served fairly between clients. When the
+    queue (or a client's share of it) is full or a client exceeds its
+    rate limit, submissions are rejected instead of piling up.
+    """
+
+    def __init__(self, scheduler: FairScheduler, workers: int, history_size: int, result_ttl: float):
+        self.workers = workers
+        self._scheduler = scheduler
+        self._active: Dict[str, Job] = {}
+        # Finished jobs are kept for a while so their results can be polled
+        self._finished = TTLCache(max_entries=history_size, ttl=result_ttl)
+        self._lock = threading.Lock()
+        # Signalled when a job is queued or a running one frees its caps
+        self._changed = threading.Condition(self._lock)
+        self._threads: list = []
+        self._stopping = False
+        self._running = 0
+        # Moving average of the run time, used for scheduling and Retry-After estimates
+        self._avg_run_time = 1.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._dispatch, daemon=True)
+                for _ in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, []
+            queued = [job for job in self._active.values() if job.status == QUEUED]
+        for job in queued:
+            self.cancel(job.id)
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        for thread in threads:
+            thread.join(timeout=1)
+
+    def submit(self, student_id: str, task: Callable[..., Optional[ExecutionResult]],
+               client_id: str = 'local', cost: int = 1) -> Job:
+        """
+        Queue a job, raising a JobRejectedError if it is not admitted.
+        cost is the number of executions charged to the client's rate
+        limit (e.g. the argument sets of a batch).
+        """
+        self.start()
+        job = Job(student_id, task, client_id, cost)
+        with self._changed:
+            try:
+                self._scheduler.admit(job, self._avg_run_time)
+            except JobRejectedError as e:
+                metrics.increment('jobs_rate_limited' if isinstance(e, RateLimitError) else 'jobs_rejected')
+                raise
+            self._active[job.id] = job
+            self._changed.notify()
+        metrics.increment('jobs_submitted')
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._active.get(job_id)
+        return job if job is not None else self._finished.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job: a queued job is dropped, a running one has its worker
+        killed. Finished jobs are left as they are.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == QUEUED and self._scheduler.remove(job):
+                self._finish(job, CANCELLED, ExecutionResult(
+                    success=False, error="Code execution was cancelled", execution_time=0.0
+                ))
+        return job
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """1-based position of a queued job among its client's jobs, None once it runs"""
+        with self._lock:
+            return self._scheduler.position(job) if job.status == QUEUED else None
+
+    def describe(self, job: Job) -> Dict[str, Any]:
+        return {
+            'job_id': job.id,
+            'student_id': job.student_id,
+            'status': job.status,
+            'queue_position': self.queue_position(job),
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'result': job.result,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._scheduler.stats(),
+                running=self._running,
+                capacity=self._scheduler.max_queued,
+                avg_run_time=self._avg_run_time,
+            )
+
+    def _finish(self, job: Job, status: str, result: ExecutionResult) -> None:
+        """Record the outcome of a job (called with the lock held)"""
+        job.status = status
+        job.result = result
+        job.finished_at = datetime.now()
+        self._active.pop(job.id, None)
+        self._finished.set(job.id, job)
+        if status == CANCELLED:
+            metrics.increment('jobs_cancelled')
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._changed:
+                job = None
+                while not self._stopping:
+                    job = self._scheduler.next(self._avg_run_time)
+                    if job is not None:
+                        break
+                    self._changed.wait()
+                if job is None:
+                    return
+                job.status = RUNNING
+                job.started_at = datetime.now()
+                self._running += 1
+
+            try:
+                result = job.task(cancel_event=job.cancel_event)
+                if result is None:
+                    result = ExecutionResult(success=False, error="Code file not found", execution_time=0.0)
+            except Exception as e:
+                result = ExecutionResult(success=False, error=str(e), execution_time=0.0)
+            run_time = (datetime.now() - job.started_at).total_seconds()
+
+            queue_wait = (job.started_at - job.created_at).total_seconds()
+            if result.stats is not None:
+                # Copied, as the result object may be shared with the result cache
+                result = result.model_copy(update={
+                    'stats': result.stats.model_copy(update={'queue_wait': queue_wait})
+                })
+            _record_execution(job.student_id, queue_wait, result)
+
+            with self._changed:
+                self._running -= 1
+                self._scheduler.finished(job, run_time)
+                if not result.cached:
+                    self._avg_run_time = 0.8 * self._avg_run_time + 0.2 * run_time
+                self._finish(job, CANCELLED if job.cancel_event.is_set() else COMPLETED, result)
+                # The job's client and student may be below their caps again
+                self._changed.notify_all()
+
+
+# Global job manager instance
+job_manager = JobManager(
+    FairScheduler(
+        workers=settings.executor_pool_size,
+        max_queued=settings.job_queue_size,
+        client_max_queued=settings.client_max_queued,
+        client_max_running=settings.client_max_running or max(1, settings.executor_pool_size - 1),
+        student_max_running=settings.student_max_running,
+        rate=settings.client_rate_limit,
+        burst=settings.client_burst,
+        weights=settings.client_weights
+    ),
+    workers=settings.executor_pool_size,
+    history_size=settings.job_history_size,
+    result_ttl=settings.job_result_ttl
+)
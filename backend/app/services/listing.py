@@ -0,0 +1,99 @@
+"""
+Сортировка, постраничная выдача и выбор полей для списков студентов
+
+Все операции выполняются над записями каталога в памяти.
+"""
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'name': lambda s: s.get('name', ''),
+    'year': lambda s: (s.get('graduation_year', 0), s.get('name', '')),
+    'title': lambda s: (s.get('thesis') or {}).get('title', ''),
+    'added_date': lambda s: s.get('added_date', ''),
+    'defense_date': lambda s: (s.get('thesis') or {}).get('defense_date', '') or '',
+}
+
+# Порядок выдачи поиска (по релевантности); сортировка не меняет его
+RELEVANCE = 'relevance'
+
+
+def parse_sort(sort: Optional[str]) -> Optional[Tuple[str, bool]]:
+    """
+    Разбор параметра сортировки вида "name" или "-year"
+
+    Возвращает (ключ, по убыванию) или None для порядка по умолчанию.
+    Неизвестный ключ вызывает ValueError.
+    """
+    if not sort or sort == RELEVANCE:
+        return None
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in SORT_KEYS:
+        raise ValueError(
+            f"Неизвестное поле сортировки: {key}. Доступны: {', '.join([RELEVANCE, *SORT_KEYS])}"
+        )
+    return key, descending
+
+
+def sort_students(students: List[Dict[str, Any]], sort: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Сортировка списка студентов (порядок по умолчанию сохраняется)
+    """
+    parsed = parse_sort(sort)
+    if parsed is None:
+        return students
+    key, descending = parsed
+    return sorted(students, key=SORT_KEYS[key], reverse=descending)
+
+
+def paginate(items: List[Any], page: int, per_page: Optional[int]) -> Tuple[List[Any], int, int]:
+    """
+    Страница списка
+
+    Возвращает (элементы страницы, размер страницы, число страниц).
+    Без per_page весь список считается одной страницей.
+    """
+    total = len(items)
+    if per_page is None:
+        return items, total, 1 if total else 0
+    start = (page - 1) * per_page
+    return items[start:start + per_page], per_page, math.ceil(total / per_page)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[List[str]]]:
+    """
+    Разбор списка полей вида "name,thesis.title" в пути по вложенным словарям
+    """
+    if not fields:
+        return None
+    paths = [field.strip().split('.') for field in fields.split(',') if field.strip()]
+    # Вложенное поле не нужно, если уже выбрано объемлющее ("thesis" и "thesis.title")
+    paths = [
+        path for path in paths
+        if not any(other != path and path[:len(other)] == other for other in paths)
+    ]
+    return paths or None
+
+
+def project(record: Dict[str, Any], paths: Optional[List[List[str]]]) -> Dict[str, Any]:
+    """
+    Копия записи только с указанными полями (id включается всегда)
+    """
+    if paths is None:
+        return record
+
+    result: Dict[str, Any] = {'id': record.get('id')}
+    for path in paths:
+        source: Any = record
+        for part in path:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = result
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = source
+    return result
@@ -0,0 +1,112 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds of histogram buckets: seconds and bytes
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(2 ** power * 1024 * 1024 for power in range(4, 13))  # 16 MB .. 4 GB
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum and maximum"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped by the maximum)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary plus cumulative bucket counts, keyed by upper bound"""
+        buckets = {}
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            buckets[str(bound)] = seen
+        buckets['+Inf'] = self.count
+        return dict(self.summary(), buckets=buckets)
+
+
+class Metrics:
+    """In-process counters and histograms exposed on the metrics endpoint"""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        # Histograms per key (e.g. student id), for breakdowns
+        self._keyed: Dict[str, Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float, key: Optional[str] = None,
+                buckets: Sequence[float] = TIME_BUCKETS) -> None:
+        """Record value in histogram name, overall and, if given, under key"""
+        with self._lock:
+            self._histogram(self._histograms, name, buckets).observe(value)
+            if key is not None:
+                self._histogram(self._keyed.setdefault(key, {}), name, buckets).observe(value)
+
+    def _histogram(self, histograms: Dict[str, Histogram], name: str,
+                   buckets: Sequence[float]) -> Histogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram(buckets)
+        return histogram
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def histograms(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+
+    def breakdown(self, sort_by: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Dict[str, float]]]]:
+        """
+        Histogram summaries per key, keys with the largest total of sort_by
+        first
+        """
+        with self._lock:
+            items = [
+                (key, {name: histogram.summary() for name, histogram in histograms.items()})
+                for key, histograms in self._keyed.items()
+            ]
+        items.sort(key=lambda item: item[1].get(sort_by, {}).get('sum', 0.0), reverse=True)
+        return items[:limit] if limit is not None else items
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -0,0 +1,147 @@
+"""
+Стеммер русского языка (алгоритм Snowball)
+
+Реализация алгоритма https://snowballstem.org/algorithms/russian/stemmer.html
+без внешних зависимостей. Слова должны быть уже приведены к нижнему
+регистру; буква «ё» заменяется на «е».
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+_VOWELS = frozenset('аеиоуыэюя')
+
+
+def _endings(*groups: str) -> Tuple[str, ...]:
+    # Более длинные окончания проверяются первыми
+    return tuple(sorted((e for group in groups for e in group.split()), key=len, reverse=True))
+
+
+_PERFECTIVE_GERUND_1 = _endings('в вши вшись')
+_PERFECTIVE_GERUND_2 = _endings('ив ивши ившись ыв ывши ывшись')
+_ADJECTIVE = _endings(
+    'ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому их ых ую юю ая яя ою ею'
+)
+_PARTICIPLE_1 = _endings('ем нн вш ющ щ')
+_PARTICIPLE_2 = _endings('ивш ывш ующ')
+_REFLEXIVE = _endings('ся сь')
+_VERB_1 = _endings('ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно')
+_VERB_2 = _endings(
+    'ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено ят ует уют ит ыт ены '
+    'ить ыть ишь ую ю'
+)
+_NOUN = _endings(
+    'а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием ем ам ом о у ах иях ях ы ь '
+    'ию ью ю ия ья я'
+)
+_SUPERLATIVE = _endings('ейш ейше')
+_DERIVATIONAL = _endings('ост ость')
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """
+    Начало областей RV и R2 в слове
+    """
+    rv = len(word)
+    for i, ch in enumerate(word):
+        if ch in _VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+
+def _strip(word: str, start: int, endings: Tuple[str, ...]) -> Optional[str]:
+    """
+    Удаление самого длинного окончания из endings внутри области [start:]
+    """
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            return word[:-len(ending)]
+    return None
+
+
+def _strip_after_a(word: str, start: int, endings: Tuple[str, ...]) -> Optional[str]:
+    """
+    Удаление окончания из первой группы: перед ним должна стоять «а» или «я»
+    """
+    for ending in endings:
+        cut = len(word) - len(ending)
+        if word.endswith(ending) and cut - 1 >= start and word[cut - 1] in 'ая':
+            return word[:cut]
+    return None
+
+
+def _strip_grouped(word: str, start: int, group_1: Tuple[str, ...],
+                   group_2: Tuple[str, ...]) -> Optional[str]:
+    """
+    Удаление самого длинного окончания из двух групп Snowball
+    """
+    candidates = [
+        result for result in (
+            _strip_after_a(word, start, group_1),
+            _strip(word, start, group_2),
+        ) if result is not None
+    ]
+    return min(candidates, key=len) if candidates else None
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """
+    Основа слова по алгоритму Snowball для русского языка
+    """
+    word = word.replace('ё', 'е')
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1
+    result = _strip_grouped(word, rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if result is None:
+        stripped = _strip(word, rv, _REFLEXIVE)
+        if stripped is not None:
+            word = stripped
+
+        result = _strip(word, rv, _ADJECTIVE)
+        if result is not None:
+            participle = _strip_grouped(result, rv, _PARTICIPLE_1, _PARTICIPLE_2)
+            if participle is not None:
+                result = participle
+        else:
+            result = _strip_grouped(word, rv, _VERB_1, _VERB_2)
+            if result is None:
+                result = _strip(word, rv, _NOUN)
+    if result is not None:
+        word = result
+
+    # Шаг 2
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3
+    result = _strip(word, r2, _DERIVATIONAL)
+    if result is not None:
+        word = result
+
+    # Шаг 4
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        result = _strip(word, rv, _SUPERLATIVE)
+        if result is not None:
+            word = result
+            if word.endswith('нн') and len(word) - 2 >= rv:
+                word = word[:-1]
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+
+    return word
@@ -0,0 +1,222 @@
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class JobRejectedError(Exception):
+    """A job was not admitted; retry_after estimates when it would be"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(JobRejectedError):
+    def __init__(self, retry_after: int):
+        super().__init__("Execution queue is full", retry_after)
+
+
+class RateLimitError(JobRejectedError):
+    def __init__(self, retry_after: int):
+        super().__init__("Too many executions requested", retry_after)
+
+
+class TokenBucket:
+    """Rate limit: tokens refill at rate per second, up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float = 1.0) -> float:
+        """
+        Take cost tokens. Returns 0 on success, otherwise the seconds until
+        they are available. A cost above burst is taken from a full bucket,
+        which goes into debt and delays the following requests accordingly.
+        """
+        self._refill()
+        needed = min(cost, self.burst)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (needed - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class _Client:
+    """Scheduling state of one client"""
+
+    def __init__(self, weight: float, rate: float, burst: float):
+        self.weight = weight
+        self.queue: Deque[Any] = deque()
+        self.running = 0
+        # Service received so far, in seconds of execution divided by weight
+        self.virtual_time = 0.0
+        self.bucket = TokenBucket(rate, burst)
+
+    def idle(self) -> bool:
+        return not self.queue and not self.running
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of jobs between clients.
+
+    Every client has its own FIFO queue. The next job comes from the
+    client that has received the least execution time relative to its
+    weight, skipping clients at their concurrency cap and jobs whose
+    student is at its cap. Execution time is charged as an estimate at
+    dispatch and corrected when the job finishes, so a client running
+    heavy simulations yields to everyone else. Submissions are limited
+    per client by a token bucket and by queue sizes.
+
+    Jobs need client_id, student_id and cost attributes; cost tokens are
+    taken from the client's bucket (none for a cost of 0). The scheduler
+    is not thread-safe; JobManager calls it under its lock.
+    """
+
+    # How often idle clients are forgotten (in admitted jobs)
+    SWEEP_INTERVAL = 256
+
+    def __init__(self, workers: int, max_queued: int, client_max_queued: int,
+                 client_max_running: int, student_max_running: int,
+                 rate: float, burst: float, weights: Optional[Dict[str, float]] = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.client_max_queued = client_max_queued
+        self.client_max_running = client_max_running
+        self.student_max_running = student_max_running
+        self.rate = rate
+        self.burst = burst
+        self.weights = weights or {}
+        self._clients: Dict[str, _Client] = {}
+        self._student_running: Dict[str, int] = {}
+        self._queued = 0
+        # Virtual time of the last dispatch; clients becoming active start
+        # here, so idle periods are not banked as credit
+        self._virtual_clock = 0.0
+        # Estimate charged per job at dispatch, by job
+        self._charged: Dict[int, float] = {}
+        self._admitted = 0
+
+    def __len__(self) -> int:
+        return self._queued
+
+    def _client(self, client_id: str) -> _Client:
+        client = self._clients.get(client_id)
+        if client is None:
+            client = self._clients[client_id] = _Client(
+                self.weights.get(client_id, 1.0), self.rate, self.burst
+            )
+        return client
+
+    def admit(self, job, run_time_estimate: float) -> None:
+        """Queue a job or raise a JobRejectedError"""
+        self._admitted += 1
+        if self._admitted % self.SWEEP_INTERVAL == 0:
+            self._sweep()
+
+        if self._queued >= self.max_queued:
+            raise QueueFullError(max(1, math.ceil(self._queued / self.workers * run_time_estimate)))
+        client = self._client(job.client_id)
+        if len(client.queue) >= self.client_max_queued:
+            raise QueueFullError(max(1, math.ceil(
+                len(client.queue) / self.client_max_running * run_time_estimate
+            )))
+        wait = client.bucket.take(job.cost) if job.cost else 0.0
+        if wait:
+            raise RateLimitError(max(1, math.ceil(min(wait, 3600))))
+
+        if client.idle():
+            client.virtual_time = max(client.virtual_time, self._virtual_clock)
+        client.queue.append(job)
+        self._queued += 1
+
+    def next(self, run_time_estimate: float):
+        """The next job to run (now counted as running), or None if none is eligible"""
+        best = None
+        for client in self._clients.values():
+            if not client.queue or client.running >= self.client_max_running:
+                continue
+            job = self._first_eligible(client)
+            if job is not None and (best is None or client.virtual_time < best[0].virtual_time):
+                best = (client, job)
+        if best is None:
+            return None
+
+        client, job = best
+        client.queue.remove(job)
+        self._queued -= 1
+        client.running += 1
+        self._student_running[job.student_id] = self._student_running.get(job.student_id, 0) + 1
+        self._virtual_clock = client.virtual_time
+        charge = run_time_estimate / client.weight
+        client.virtual_time += charge
+        self._charged[id(job)] = charge
+        return job
+
+    def _first_eligible(self, client: _Client):
+        for job in client.queue:
+            if self._student_running.get(job.student_id, 0) < self.student_max_running:
+                return job
+        return None
+
+    def finished(self, job, run_time: float) -> None:
+        """Record that a job returned by next() has finished after run_time seconds"""
+        client = self._clients[job.client_id]
+        client.running -= 1
+        client.virtual_time += run_time / client.weight - self._charged.pop(id(job), 0.0)
+        running = self._student_running.get(job.student_id, 0) - 1
+        if running > 0:
+            self._student_running[job.student_id] = running
+        else:
+            self._student_running.pop(job.student_id, None)
+
+    def remove(self, job) -> bool:
+        """Remove a queued job (cancellation); False if it is not queued"""
+        client = self._clients.get(job.client_id)
+        if client is None:
+            return False
+        try:
+            client.queue.remove(job)
+        except ValueError:
+            return False
+        self._queued -= 1
+        return True
+
+    def position(self, job) -> Optional[int]:
+        """1-based position of a queued job in its client's queue"""
+        client = self._clients.get(job.client_id)
+        if client is not None:
+            for position, queued in enumerate(client.queue, 1):
+                if queued is job:
+                    return position
+        return None
+
+    def _sweep(self) -> None:
+        """Forget idle clients whose rate limit has fully recovered"""
+        for client_id in [
+            client_id for client_id, client in self._clients.items()
+            if client.idle() and client.bucket.full() and client.virtual_time <= self._virtual_clock
+        ]:
+            del self._clients[client_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': self._queued,
+            'clients': len(self._clients),
+            'active_clients': sum(not client.idle() for client in self._clients.values()),
+        }
@@ -0,0 +1,311 @@
+"""
+Полнотекстовый поиск по каталогу студентов
+
+Инвертированный индекс по имени, названию работы, аннотации, ключевым
+словам и научному руководителю с весами полей и ранжированием BM25.
+Слова приводятся к основе русским стеммером, поэтому разные словоформы
+(«временных рядов» и «временной ряд») совпадают.
+"""
+
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .russian_stemmer import stem
+
+# Веса полей при подсчете частоты термина
+FIELD_BOOSTS = {
+    'name': 3.0,
+    'title': 2.5,
+    'keywords': 2.0,
+    'advisor': 1.5,
+    'summary': 1.0,
+}
+
+# Минимальная длина последнего слова запроса для поиска по префиксу
+MIN_PREFIX_LENGTH = 3
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    """
+    Приведение регистра и замена «ё» на «е»
+    """
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбиение текста на нормализованные слова
+    """
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Термины индекса: нормализованные слова, приведенные к основе
+    """
+    return [stem(word) for word in tokenize(text)]
+
+
+def extract_fields(record: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Текст индексируемых полей записи студента
+    """
+    thesis = record.get('thesis', {}) or {}
+    return {
+        'name': record.get('name', '') or '',
+        'title': thesis.get('title', '') or '',
+        'summary': thesis.get('summary', '') or '',
+        'keywords': ' '.join(thesis.get('keywords', []) or []),
+        'advisor': thesis.get('advisor', '') or '',
+    }
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс с ранжированием BM25.
+
+    Списки вхождений хранят взвешенную (с учетом FIELD_BOOSTS) частоту
+    основы слова в документе. Термины записи вычисляются один раз при
+    индексации и хранятся вместе с документом, а на запрос приходится
+    только разбор его собственных слов. Индекс подключается к каталогу через
+    StudentCatalog.attach и обновляется по одной записи.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    # --- Обновление -------------------------------------------------------
+
+    def add(self, doc_id: str, record: Dict[str, Any]) -> None:
+        self.remove(doc_id)
+
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, text in extract_fields(record).items():
+            boost = FIELD_BOOSTS[field]
+            for term in analyze(text):
+                terms[term] = terms.get(term, 0.0) + boost
+                length += boost
+
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[doc_id] = weight
+
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    # --- Поиск ------------------------------------------------------------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        position = bisect_left(self._vocabulary, prefix)
+        terms = []
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            terms.append(self._vocabulary[position])
+            position += 1
+        return terms
+
+    def _query_groups(self, query: str) -> List[List[str]]:
+        """
+        Группы терминов индекса для каждого слова запроса.
+
+        Последнее слово запроса дополнительно раскрывается по префиксу,
+        чтобы поиск работал для недописанного слова.
+        """
+        words = list(dict.fromkeys(analyze(query)))
+        groups = []
+        for position, word in enumerate(words):
+            group = [word] if word in self._postings else []
+            if position == len(words) - 1 and len(word) >= MIN_PREFIX_LENGTH:
+                group.extend(term for term in self._expand_prefix(word) if term != word)
+            groups.append(group)
+        return groups
+
+    def _matching_docs(self, group: Iterable[str]) -> set:
+        docs = set()
+        for term in group:
+            docs.update(self._postings[term])
+        return docs
+
+    def search(self, query: str, match_all: bool = True) -> List[Tuple[str, float]]:
+        """
+        Поиск документов по запросу.
+
+        match_all=True требует наличия всех слов запроса (AND),
+        иначе достаточно любого из них (OR). Результат отсортирован по
+        убыванию оценки BM25.
+        """
+        groups = self._query_groups(query)
+        if not groups:
+            return []
+
+        if match_all:
+            if not all(groups):
+                return []
+            # Пересекаем начиная с самого короткого списка вхождений
+            doc_sets = sorted((self._matching_docs(group) for group in groups), key=len)
+            candidates = doc_sets[0]
+            for docs in doc_sets[1:]:
+                candidates = candidates & docs
+                if not candidates:
+                    return []
+        else:
+            candidates = set()
+            for group in groups:
+                candidates |= self._matching_docs(group)
+
+        total_docs = len(self._doc_lengths)
+        avg_length = self._total_length / total_docs if total_docs else 0.0
+        scores = dict.fromkeys(candidates, 0.0)
+
+        for term in {term for group in groups for term in group}:
+            postings = self._postings[term]
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(candidates) < len(postings):
+                matches = ((doc_id, postings.get(doc_id)) for doc_id in candidates)
+            else:
+                matches = ((doc_id, tf) for doc_id, tf in postings.items() if doc_id in scores)
+            for doc_id, tf in matches:
+                if tf is None:
+                    continue
+                norm = 1 - self.b + self.b * (self._doc_lengths[doc_id] / avg_length if avg_length else 0.0)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def trigrams(word: str) -> frozenset:
+    """
+    Множество триграмм слова с дополнением пробелами (как в pg_trgm)
+    """
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """
+    Триграммный индекс для нечеткого поиска по имени студента и научному
+    руководителю.
+
+    Индексируются отдельные слова: триграмма указывает на слова словаря,
+    слово - на документы. Поиск перебирает только списки триграмм запроса,
+    поэтому не требует сравнения запроса с каждой записью.
+    """
+
+    FIELDS = ('name', 'advisor')
+
+    def __init__(self):
+        self._trigram_words: Dict[str, set] = {}
+        self._word_docs: Dict[str, set] = {}
+        self._word_sizes: Dict[str, int] = {}
+        self._doc_words: Dict[str, set] = {}
+
+    def add(self, doc_id: str, record: Dict[str, Any]) -> None:
+        self.remove(doc_id)
+
+        fields = extract_fields(record)
+        words = {word for field in self.FIELDS for word in tokenize(fields[field])}
+        for word in words:
+            docs = self._word_docs.get(word)
+            if docs is None:
+                docs = self._word_docs[word] = set()
+                grams = trigrams(word)
+                self._word_sizes[word] = len(grams)
+                for gram in grams:
+                    self._trigram_words.setdefault(gram, set()).add(word)
+            docs.add(doc_id)
+        self._doc_words[doc_id] = words
+
+    def remove(self, doc_id: str) -> None:
+        words = self._doc_words.pop(doc_id, None)
+        if words is None:
+            return
+
+        for word in words:
+            docs = self._word_docs[word]
+            docs.discard(doc_id)
+            if docs:
+                continue
+            del self._word_docs[word]
+            del self._word_sizes[word]
+            for gram in trigrams(word):
+                gram_words = self._trigram_words[gram]
+                gram_words.discard(word)
+                if not gram_words:
+                    del self._trigram_words[gram]
+
+    def similar_words(self, word: str, threshold: float) -> Dict[str, float]:
+        """
+        Слова словаря со сходством по триграммам не ниже threshold
+        """
+        grams = trigrams(word)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigram_words.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        result = {}
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + self._word_sizes[candidate] - count)
+            if similarity >= threshold:
+                result[candidate] = similarity
+        return result
+
+    def search(self, query: str, threshold: float = 0.3) -> List[Tuple[str, float]]:
+        """
+        Нечеткий поиск документов.
+
+        Для каждого слова запроса берется лучшее сходство со словами
+        документа; оценка документа - среднее по словам запроса. В результат
+        попадают документы с оценкой не ниже threshold.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        totals: Dict[str, float] = {}
+        for word in words:
+            best: Dict[str, float] = {}
+            for candidate, similarity in self.similar_words(word, threshold).items():
+                for doc_id in self._word_docs[candidate]:
+                    if similarity > best.get(doc_id, 0.0):
+                        best[doc_id] = similarity
+            for doc_id, similarity in best.items():
+                totals[doc_id] = totals.get(doc_id, 0.0) + similarity
+
+        scores = [(doc_id, total / len(words)) for doc_id, total in totals.items()]
+        return sorted(
+            (item for item in scores if item[1] >= threshold),
+            key=lambda item: -item[1]
+        )
@@ -0,0 +1,101 @@
+"""
+Агрегированная статистика по каталогу студентов
+
+Счетчики обновляются при добавлении, изменении и удалении записи, поэтому
+запрос статистики не требует обхода каталога.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Сколько самых частых руководителей и ключевых слов отдавать в статистике
+TOP_LIMIT = 20
+
+
+def _contribution(student_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    thesis = record.get('thesis', {}) or {}
+    return {
+        'year': int(student_id.split('_', 1)[0]),
+        'has_code': bool(record.get('code', {}).get('has_code', False)),
+        'advisor': thesis.get('advisor') or None,
+        'keywords': sorted({k for k in thesis.get('keywords', []) or [] if k}),
+    }
+
+
+class CatalogStatistics:
+    """
+    Инкрементально поддерживаемые счетчики: всего студентов, по годам,
+    с кодом, по научным руководителям и ключевым словам.
+    """
+
+    def __init__(self):
+        self._contributions: Dict[str, Dict[str, Any]] = {}
+        self._year_counts: Counter = Counter()
+        self._year_with_code: Counter = Counter()
+        self._advisors: Counter = Counter()
+        self._keywords: Counter = Counter()
+        self._with_code = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self._contributions)
+
+    @staticmethod
+    def _bump(counter: Counter, key: Any, delta: int) -> None:
+        counter[key] += delta
+        # Нулевые счетчики удаляются, чтобы не показывать пустые годы
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _apply(self, contribution: Dict[str, Any], delta: int) -> None:
+        year = contribution['year']
+        self._bump(self._year_counts, year, delta)
+        if contribution['has_code']:
+            self._bump(self._year_with_code, year, delta)
+            self._with_code += delta
+        if contribution['advisor']:
+            self._bump(self._advisors, contribution['advisor'], delta)
+        for keyword in contribution['keywords']:
+            self._bump(self._keywords, keyword, delta)
+        self._snapshot = None
+
+    def add(self, student_id: str, record: Dict[str, Any]) -> None:
+        self.remove(student_id)
+        contribution = _contribution(student_id, record)
+        self._contributions[student_id] = contribution
+        self._apply(contribution, 1)
+
+    def remove(self, student_id: str) -> None:
+        contribution = self._contributions.pop(student_id, None)
+        if contribution is not None:
+            self._apply(contribution, -1)
+
+    @staticmethod
+    def _top(counter: Counter) -> List[Dict[str, Any]]:
+        return [{'name': name, 'count': count} for name, count in counter.most_common(TOP_LIMIT)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Статистика в формате ответа /statistics (кешируется до изменения)
+        """
+        if self._snapshot is None:
+            years = sorted(self._year_counts, reverse=True)
+            self._snapshot = {
+                'total_students': len(self._contributions),
+                'total_years': len(years),
+                'students_with_code': self._with_code,
+                'years_range': {
+                    'min': min(years) if years else None,
+                    'max': max(years) if years else None
+                },
+                'by_year': {
+                    year: {
+                        'count': self._year_counts[year],
+                        'with_code': self._year_with_code[year]
+                    }
+                    for year in years
+                },
+                'top_advisors': self._top(self._advisors),
+                'top_keywords': self._top(self._keywords),
+            }
+        return self._snapshot
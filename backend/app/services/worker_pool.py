@@ -0,0 +1,760 @@
+import io
+import os
+import sys
+import math
+import marshal
+import time
+import queue
+import signal
+import warnings
+import threading
+import multiprocessing
+from contextlib import contextmanager, nullcontext, redirect_stdout, redirect_stderr
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class WorkerTimeoutError(Exception):
+    pass
+
+
+class WorkerCrashedError(Exception):
+    pass
+
+
+class PoolBusyError(Exception):
+    pass
+
+
+class ExecutionCancelledError(Exception):
+    pass
+
+
+class CPUTimeLimitExceeded(Exception):
+    pass
+
+
+def _raise_cpu_limit(signum, frame):
+    raise CPUTimeLimitExceeded("CPU time limit exceeded")
+
+
+def _proc_status_bytes(field: str) -> int:
+    """A memory size from /proc/self/status (e.g. VmSize) in bytes, 0 if unknown"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _address_space_size() -> int:
+    """Current virtual memory size of the process in bytes"""
+    return _proc_status_bytes('VmSize')
+
+
+def _reset_peak_rss() -> None:
+    """Reset the peak resident set size (Linux), so it can be measured per run"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of the process in bytes"""
+    peak = _proc_status_bytes('VmHWM')
+    if not peak and resource is not None:
+        # Peak over the whole life of the process (kilobytes on Linux)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return peak
+
+
+class _RunStats:
+    """Stage timings, CPU time and peak memory of one run in a worker"""
+
+    def __init__(self):
+        _reset_peak_rss()
+        self.stages = {'setup': 0.0, 'load': 0.0, 'run': 0.0, 'render': 0.0}
+        self._cpu_start = time.process_time()
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Charge the time since the previous lap to stage"""
+        now = time.perf_counter()
+        self.stages[stage] += now - self._last
+        self._last = now
+
+    def finish(self) -> Dict[str, Any]:
+        return dict(
+            self.stages,
+            cpu_time=time.process_time() - self._cpu_start,
+            peak_rss=_peak_rss(),
+            # Monotonic time is system-wide, so the parent can tell how long
+            # the result took to reach it
+            finished=time.monotonic(),
+        )
+
+
+@contextmanager
+def _resource_limits(cpu_seconds: Optional[float], memory_bytes: Optional[int]):
+    """
+    Per-job limits: CPU time (delivered as SIGXCPU) and address space
+    growth (allocations beyond it raise MemoryError). Only soft limits are
+    changed, so they can be lifted again after the job.
+    """
+    if resource is None:
+        yield
+        return
+
+    saved = {}
+    try:
+        if cpu_seconds:
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            limit = math.ceil(used.ru_utime + used.ru_stime + cpu_seconds)
+            saved[resource.RLIMIT_CPU] = resource.getrlimit(resource.RLIMIT_CPU)
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, saved[resource.RLIMIT_CPU][1]))
+        if memory_bytes:
+            saved[resource.RLIMIT_AS] = resource.getrlimit(resource.RLIMIT_AS)
+            limit = _address_space_size() + memory_bytes
+            hard = saved[resource.RLIMIT_AS][1]
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        yield
+    finally:
+        for kind, limits in saved.items():
+            resource.setrlimit(kind, limits)
+
+
+class BoundedOutput(io.TextIOBase):
+    """
+    Output stream of one execution that keeps at most max_chars characters.
+
+    Everything written past the limit is dropped and only counted, so a
+    script that prints megabytes cannot bloat the worker's memory. With a
+    sink, the kept text is passed on as it is written instead of stored.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, sink: Optional[Callable[[str], None]] = None):
+        super().__init__()
+        self.max_chars = max_chars
+        self.sink = sink
+        self._parts: list = []
+        self._size = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        written = len(text)
+        if self.max_chars is not None:
+            room = self.max_chars - self._size
+            if len(text) > room:
+                self.dropped += len(text) - max(room, 0)
+                text = text[:max(room, 0)]
+        if text:
+            if self.sink is not None:
+                self.sink(text)
+            else:
+                self._parts.append(text)
+            self._size += len(text)
+        return written
+
+    def getvalue(self) -> str:
+        value = ''.join(self._parts)
+        if self.dropped:
+            value += f"\n... [output truncated: {self.dropped} characters omitted]\n"
+        return value
+
+
+class _OutputSender:
+    """
+    Line-buffered sender of a streaming job's output.
+
+    Complete lines are sent over the worker's pipe as ('output', text)
+    messages. A full pipe blocks the sender, so a slow reader throttles
+    the job instead of its output piling up in memory.
+    """
+
+    MAX_BUFFER = 4096
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._parts: list = []
+        self._size = 0
+
+    def __call__(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if '\n' in text or self._size >= self.MAX_BUFFER:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._parts:
+            text = ''.join(self._parts)
+            self._parts = []
+            self._size = 0
+            self.conn.send(('output', text))
+
+
+# Runs main(*args) after the module body, compiled once per worker
+_MAIN_TRAILER = compile(
+    "try:\n"
+    "    if 'main' in globals() and callable(main):\n"
+    "        main(*args)\n"
+    "except NameError:\n"
+    "    pass\n",
+    '<auto-main>', 'exec'
+)
+
+# Unmarshalled code objects of recently executed modules, by source digest
+_CODE_OBJECTS_LIMIT = 64
+_code_objects: Dict[str, Any] = {}
+
+
+def _load_code(job: Dict[str, Any]) -> Tuple[Any, bool]:
+    """Code object of the job's module and whether it was already cached"""
+    digest = job['digest']
+    code = _code_objects.get(digest)
+    if code is not None:
+        return code, True
+    code = marshal.loads(job['bytecode'])
+    if len(_code_objects) >= _CODE_OBJECTS_LIMIT:
+        _code_objects.pop(next(iter(_code_objects)))
+    _code_objects[digest] = code
+    return code, False
+
+
+class _PeakSampler(threading.Thread):
+    """
+    Keeps a tracemalloc snapshot taken near the peak of traced memory.
+
+    A snapshot taken after the run only shows memory still held at the
+    end, when the temporaries of main() are already freed; this thread
+    polls the traced size and takes a new snapshot whenever it grows past
+    the last one by GROWTH (and at least MIN_GROWTH bytes). Snapshots cost
+    time proportional to the number of live allocations, so after each one
+    sampling pauses for COST_RATIO times as long as it took.
+    """
+
+    INTERVAL = 0.002
+    GROWTH = 1.2
+    MIN_GROWTH = 1024 * 1024
+    COST_RATIO = 9
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.snapshot = None
+        self._size = 0
+        self._resume = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.INTERVAL):
+            if time.perf_counter() >= self._resume:
+                self.sample()
+
+    def sample(self) -> None:
+        import tracemalloc
+
+        current, _ = tracemalloc.get_traced_memory()
+        if self.snapshot is not None and current < max(self._size * self.GROWTH, self._size + self.MIN_GROWTH):
+            return
+        started = time.perf_counter()
+        # The old snapshot is itself traced memory
+        self.snapshot = None
+        self.snapshot = tracemalloc.take_snapshot()
+        self._size = current
+        self._resume = time.perf_counter() + (time.perf_counter() - started) * self.COST_RATIO
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        # The end of the run may be the peak itself
+        self.sample()
+
+
+@contextmanager
+def _profiling(result: Dict[str, Any], limit: int):
+    """
+    Run the block under cProfile and tracemalloc and put the top functions
+    by cumulative time, the top allocation sites at the peak of traced
+    memory and the peak itself into result['profile']
+    """
+    import contextlib
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    sampler = _PeakSampler()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        # Stopped first: grouping millions of traces while tracing is slow
+        tracemalloc.stop()
+        # Allocations of the worker machinery itself are not the job's;
+        # filtered per line rather than per trace, as there may be millions
+        machinery = (tracemalloc.__file__, __file__, contextlib.__file__, threading.__file__)
+        machinery_dir = os.path.dirname(multiprocessing.__file__) + os.sep
+        allocations = [
+            stat for stat in sampler.snapshot.statistics('lineno')
+            if stat.traceback[0].filename not in machinery
+            and not stat.traceback[0].filename.startswith(machinery_dir)
+        ]
+
+        functions = [
+            item for item in pstats.Stats(profiler).stats.items()
+            if '_lsprof.Profiler' not in item[0][2]
+        ]
+        functions.sort(key=lambda item: item[1][3], reverse=True)
+        result['profile'] = {
+            'functions': [
+                {
+                    'function': name, 'filename': filename, 'line': line, 'calls': calls,
+                    'total_time': total_time, 'cumulative_time': cumulative_time,
+                }
+                for (filename, line, name), (_, calls, total_time, cumulative_time, _)
+                in functions[:limit]
+            ],
+            'allocations': [
+                {
+                    'filename': stat.traceback[0].filename, 'line': stat.traceback[0].lineno,
+                    'size': stat.size, 'count': stat.count,
+                }
+                for stat in allocations[:limit]
+            ],
+            'peak_memory': peak,
+        }
+
+
+def _capture_figures(options: Optional[Tuple[str, int, int]]) -> list:
+    """
+    Render the figures a job left open (format, dpi and maximum count are
+    given by options) and close all of them, so none leak into the next job
+    """
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    if pyplot is None or not pyplot.get_fignums():
+        return []
+    images = []
+    try:
+        if options is not None:
+            figure_format, dpi, limit = options
+            pil_kwargs = {'lossless': True} if figure_format == 'webp' else {'optimize': True}
+            for number in pyplot.get_fignums()[:limit]:
+                buffer = io.BytesIO()
+                pyplot.figure(number).savefig(buffer, format=figure_format, dpi=dpi, pil_kwargs=pil_kwargs)
+                images.append(buffer.getvalue())
+    finally:
+        pyplot.close('all')
+    return images
+
+
+def _seed_random(seed: int) -> None:
+    """Seed the random generators so that the run is reproducible"""
+    import random
+    random.seed(seed)
+    numpy = sys.modules.get('numpy')
+    if numpy is not None:
+        numpy.random.seed(seed)
+
+
+def _make_print(stream: BoundedOutput):
+    """print() bound to the execution's own output stream"""
+    def _print(*values, sep=' ', end='\n', file=None, flush=False):
+        print(*values, sep=sep, end=end, file=stream if file is None else file, flush=flush)
+    return _print
+
+
+def _globals_template(restricted_builtins: dict, allowed_modules: Iterable[str]) -> MappingProxyType:
+    """
+    Read-only base namespace of all executions in a worker, built once at
+    startup: the restricted builtins and the (already imported) allowed
+    modules.
+    """
+    template = {
+        '__builtins__': MappingProxyType(dict(restricted_builtins)),
+        '__name__': '__main__',
+    }
+    for module_name in allowed_modules:
+        # A submodule such as matplotlib.pyplot is imported and made
+        # available through its top-level package
+        try:
+            template[module_name.partition('.')[0]] = __import__(module_name)
+        except ImportError:
+            pass
+    return MappingProxyType(template)
+
+
+def _make_globals(template: MappingProxyType, stdout_capture: BoundedOutput, args: list) -> Dict[str, Any]:
+    """Globals of one execution: a shallow copy of the template"""
+    safe_globals = dict(template)
+    # print() writes straight to this execution's buffer instead of going
+    # through the global sys.stdout
+    safe_globals['__builtins__'] = dict(template['__builtins__'], print=_make_print(stdout_capture))
+    safe_globals['args'] = args
+    return safe_globals
+
+
+def _render_figures(job: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Put the job's rendered figures into result['figures']"""
+    result['figures'] = []
+    try:
+        with _resource_limits(job.get('cpu_time_limit'), job.get('memory_limit')):
+            result['figures'] = _capture_figures(job.get('figures'))
+    except MemoryError:
+        result['error'] = result['error'] or "Memory limit exceeded while rendering figures"
+    except Exception as e:
+        result['error'] = result['error'] or f"Rendering figures failed: {e}"
+
+
+def _execute_job(job: Dict[str, Any], template: MappingProxyType, conn=None) -> Dict[str, Any]:
+    """
+    Run one job inside a worker process.
+
+    For a streaming job stdout is sent over conn while the job runs, and
+    only what was not sent (the truncation note) is left in the result.
+    A job with 'profile' set to a number N is profiled (see _profiling).
+    """
+    stats = _RunStats()
+    max_output = job.get('max_output')
+    sender = _OutputSender(conn) if job.get('stream') and conn is not None else None
+    stdout_capture = BoundedOutput(max_output, sink=sender)
+    stderr_capture = BoundedOutput(max_output)
+
+    safe_globals = _make_globals(template, stdout_capture, job['args'])
+
+    if job.get('seed') is not None:
+        _seed_random(job['seed'])
+    stats.lap('setup')
+
+    code, code_cache_hit = _load_code(job)
+    result = {'stdout': '', 'stderr': '', 'error': None, 'code_cache_hit': code_cache_hit}
+    stats.lap('load')
+
+    profile_limit = job.get('profile')
+    try:
+        with _resource_limits(job.get('cpu_time_limit'), job.get('memory_limit')), \
+                redirect_stdout(stdout_capture), redirect_stderr(stderr_capture), \
+                (_profiling(result, profile_limit) if profile_limit else nullcontext()):
+            exec(code, safe_globals)
+            exec(_MAIN_TRAILER, safe_globals)
+    except MemoryError:
+        result['error'] = "Memory limit exceeded"
+    except Exception as e:
+        result['error'] = str(e)
+    stats.lap('run')
+    _render_figures(job, result)
+    stats.lap('render')
+
+    if sender is not None:
+        sender.flush()
+    result['stdout'] = stdout_capture.getvalue()
+    result['stderr'] = stderr_capture.getvalue()
+    result['stats'] = stats.finish()
+    return result
+
+
+def _execute_batch(job: Dict[str, Any], template: MappingProxyType, conn) -> Dict[str, Any]:
+    """
+    Run main(*args) for every argument set of a batch job.
+
+    The module body runs once and its globals are reused by all calls.
+    Each call gets its own output buffers, random seed, resource limits
+    and figures, and its result is sent over conn as ('point', index,
+    result) as soon as it is ready; ('started',) and ('ready',) are sent
+    before and after the module body. Output and figures of the module
+    body itself are discarded.
+    """
+    conn.send(('started',))
+    stats = _RunStats()
+    max_output = job.get('max_output')
+    time_limit = job.get('point_time_limit') or job.get('cpu_time_limit')
+    safe_globals = _make_globals(template, BoundedOutput(0), [])
+    stats.lap('setup')
+    code, code_cache_hit = _load_code(job)
+    stats.lap('load')
+
+    setup_error = None
+    if job.get('seed') is not None:
+        _seed_random(job['seed'])
+    try:
+        with _resource_limits(time_limit, job.get('memory_limit')), \
+                redirect_stdout(BoundedOutput(0)), redirect_stderr(BoundedOutput(0)):
+            exec(code, safe_globals)
+    except MemoryError:
+        setup_error = "Memory limit exceeded"
+    except Exception as e:
+        setup_error = str(e)
+    _capture_figures(None)
+    main = safe_globals.get('main')
+    if setup_error is None and not callable(main):
+        setup_error = "main() is not defined"
+    stats.lap('setup')
+    conn.send(('ready',))
+
+    # Each call resets the peak memory, so the batch's peak is tracked here
+    peak_rss = _peak_rss()
+    render_time = 0.0
+    for index, args in job['batch']:
+        result = {'stdout': '', 'stderr': '', 'error': setup_error, 'time': 0.0, 'figures': []}
+        if setup_error is None:
+            point_stats = _RunStats()
+            stdout_capture = BoundedOutput(max_output)
+            stderr_capture = BoundedOutput(max_output)
+            safe_globals['__builtins__']['print'] = _make_print(stdout_capture)
+            safe_globals['args'] = args
+            if job.get('seed') is not None:
+                _seed_random(job['seed'])
+            point_stats.lap('setup')
+            start = time.perf_counter()
+            try:
+                with _resource_limits(time_limit, job.get('memory_limit')), \
+                        redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+                    main(*args)
+            except MemoryError:
+                result['error'] = "Memory limit exceeded"
+            except Exception as e:
+                result['error'] = str(e)
+            point_stats.lap('run')
+            _render_figures(dict(job, cpu_time_limit=time_limit), result)
+            point_stats.lap('render')
+            result['time'] = time.perf_counter() - start
+            result['stdout'] = stdout_capture.getvalue()
+            result['stderr'] = stderr_capture.getvalue()
+            result['stats'] = point_stats.finish()
+            peak_rss = max(peak_rss, result['stats']['peak_rss'])
+            render_time += result['stats']['render']
+        conn.send(('point', index, result))
+
+    stats.lap('run')
+    stats.stages['run'] -= render_time
+    stats.stages['render'] = render_time
+    return {
+        'stdout': '', 'stderr': '', 'error': None, 'code_cache_hit': code_cache_hit,
+        'stats': dict(stats.finish(), peak_rss=peak_rss),
+    }
+
+
+def _worker_main(conn, allowed_modules: Iterable[str], allowed_builtins: Iterable[str]) -> None:
+    """Entry point of a worker process: pre-import modules, then serve jobs"""
+    # Workers run in parallel, so numeric libraries must not spawn their own thread pools
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(variable, '1')
+    # Figures are rendered headless; plt.show() has nothing to show and
+    # must not warn into the job's stderr
+    os.environ['MPLBACKEND'] = 'Agg'
+    warnings.filterwarnings('ignore', message='.*non-interactive.*cannot be shown')
+
+    # Importing the allowed modules happens here, once per worker
+    import builtins
+    template = _globals_template(
+        {name: getattr(builtins, name) for name in allowed_builtins if hasattr(builtins, name)},
+        allowed_modules
+    )
+
+    if hasattr(signal, 'SIGXCPU'):
+        signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+
+    while True:
+        try:
+            job = conn.recv()
+        except CPUTimeLimitExceeded:
+            # A late SIGXCPU from the previous job, its limit is already lifted
+            continue
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        if 'batch' in job:
+            conn.send(_execute_batch(job, template, conn))
+        else:
+            conn.send(_execute_job(job, template, conn))
+
+
+class _Worker:
+    """A worker process and the parent end of its pipe"""
+
+    def __init__(self, context, allowed_modules, allowed_builtins):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, list(allowed_modules), list(allowed_builtins)),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+
+class WorkerPool:
+    """
+    Pool of long-lived worker processes.
+
+    Every worker imports the allowed modules once at startup, so jobs skip
+    the import cost. Jobs are sent over a pipe to an idle worker and run in
+    parallel across processes (and therefore across cores).
+    """
+
+    # How often a running job checks its cancel_event
+    CANCEL_POLL_INTERVAL = 0.05
+
+    def __init__(self, size: int, allowed_modules: Iterable[str], allowed_builtins: Iterable[str],
+                 memory_limit_mb: Optional[int] = None, start_method: str = 'spawn'):
+        self.size = size
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.allowed_modules = list(allowed_modules)
+        self.allowed_builtins = list(allowed_builtins)
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: list = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.allowed_modules, self.allowed_builtins)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker) -> None:
+        """Kill a worker and put a fresh one into the pool (in the background)"""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.kill()
+
+        def respawn():
+            self._idle.put(self._spawn())
+
+        threading.Thread(target=respawn, daemon=True).start()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def _receive(self, worker: _Worker, deadline: float, cancel_event: Optional[threading.Event],
+                 on_output: Optional[Callable[[str], None]],
+                 on_point: Optional[Callable[[int, Dict[str, Any]], None]],
+                 point_timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the job's result, passing output chunks of a streaming job
+        to on_output and results of a batch job's calls to on_point.
+        With point_timeout, every step of a batch job (the module body and
+        each call) must report within that many seconds of the previous
+        one, counted from the worker's ('started',) message (a new worker
+        may still be importing modules before it).
+        Returns None if a deadline passes or the job is cancelled first.
+        """
+        interval = None if cancel_event is None else self.CANCEL_POLL_INTERVAL
+        step_deadline = None
+        while True:
+            now = time.monotonic()
+            remaining = (deadline if step_deadline is None else min(deadline, step_deadline)) - now
+            if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                return None
+            if not worker.conn.poll(remaining if interval is None else min(remaining, interval)):
+                continue
+            message = worker.conn.recv()
+            if isinstance(message, tuple):  # ('output', text), ('point', index, result), ('started',) or ('ready',)
+                if message[0] == 'output' and on_output is not None:
+                    on_output(message[1])
+                elif message[0] == 'point' and on_point is not None:
+                    on_point(message[1], message[2])
+                if point_timeout is not None and message[0] != 'output':
+                    step_deadline = time.monotonic() + point_timeout
+                continue
+            return message
+
+    def run(self, job: Dict[str, Any], timeout: float,
+            cancel_event: Optional[threading.Event] = None,
+            on_output: Optional[Callable[[str], None]] = None,
+            on_point: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run a job on an idle worker and wait for its result.
+
+        timeout bounds the whole call, including the wait for an idle
+        worker. A job that does not finish in time, or whose cancel_event
+        is set, has its worker process killed (which reclaims the CPU) and
+        replaced; inside the worker the job is also limited in CPU time and
+        address space. If on_output is given, the job's stdout is streamed
+        to it chunk by chunk; a blocking on_output throttles the job.
+
+        A job with a 'batch' of (index, args) pairs calls main(*args) for
+        each pair and reports every call to on_point. Its CPU time limit
+        and a wall-clock deadline apply per call ('point_time_limit'): a
+        call that overruns it (e.g. sleeping or blocked) has the worker
+        killed like a job past its timeout.
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolBusyError()
+
+        job = dict(job, cpu_time_limit=timeout, memory_limit=self.memory_limit,
+                   stream=on_output is not None)
+        try:
+            worker.conn.send(job)
+            result = self._receive(worker, deadline, cancel_event, on_output, on_point,
+                                   job.get('point_time_limit') if 'batch' in job else None)
+        except (EOFError, OSError, BrokenPipeError) as e:
+            self._replace(worker)
+            raise WorkerCrashedError(str(e) or "Worker process exited") from e
+        except BaseException:
+            self._replace(worker)
+            raise
+
+        if result is None:
+            # The job is still running: kill the worker to stop it
+            self._replace(worker)
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExecutionCancelledError()
+            raise WorkerTimeoutError()
+
+        self._idle.put(worker)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._started = False
+        for worker in workers:
+            worker.stop()
+        self._idle = queue.Queue()
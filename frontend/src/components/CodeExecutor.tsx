@@ -1,21 +1,36 @@
 import React, { useState } from 'react';
 import { ExecutionResult } from '../types/thesis';
+import { figureUrl } from '../services/api';
 
 interface CodeExecutorProps {
   code: string;
-  onExecute: (args?: string) => Promise<ExecutionResult>;
+  // onOutput receives the output while the code runs
+  onExecute: (
+    args?: string,
+    onOutput?: (chunk: string) => void,
+    profile?: boolean
+  ) => Promise<ExecutionResult>;
 }
 
 const CodeExecutor: React.FC<CodeExecutorProps> = ({ code, onExecute }) => {
   const [args, setArgs] = useState('');
   const [result, setResult] = useState<ExecutionResult | null>(null);
   const [loading, setLoading] = useState(false);
+  const [liveOutput, setLiveOutput] = useState('');
+  const [profile, setProfile] = useState(false);
 
   const handleExecute = async () => {
     setLoading(true);
+    setResult(null);
+    setLiveOutput('');
+    let streamed = '';
     try {
-      const executionResult = await onExecute(args.trim() || undefined);
-      setResult(executionResult);
+      const executionResult = await onExecute(args.trim() || undefined, (chunk) => {
+        streamed += chunk;
+        setLiveOutput(streamed);
+      }, profile);
+      // Streamed output is not repeated in the final result
+      setResult(streamed ? { ...executionResult, result: executionResult.result ?? streamed } : executionResult);
     } catch (error) {
       setResult({
         success: false,
@@ -49,10 +64,21 @@ const CodeExecutor: React.FC<CodeExecutorProps> = ({ code, onExecute }) => {
           className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-2 focus:ring-blue-500 focus:border-transparent"
         />
         <p className="text-xs text-gray-500 mt-1">
-          Пример: 1,2,3 или "привет","мир" или 10.5,20.3
+          Пример: 1,2,3 или "привет","мир" или -0.5,1e-3
         </p>
       </div>
 
+      {/* Profiling */}
+      <label className="flex items-center text-sm text-gray-700 mb-4">
+        <input
+          type="checkbox"
+          checked={profile}
+          onChange={(e) => setProfile(e.target.checked)}
+          className="mr-2"
+        />
+        Профилирование (время по функциям и память)
+      </label>
+
       {/* Execute Button */}
       <button
         onClick={handleExecute}
@@ -62,6 +88,13 @@ const CodeExecutor: React.FC<CodeExecutorProps> = ({ code, onExecute }) => {
         {loading ? 'Выполнение...' : 'Запустить код'}
       </button>
 
+      {/* Output while the code is running */}
+      {loading && liveOutput && (
+        <div className="mt-4 p-4 rounded-md bg-gray-100 border border-gray-200">
+          <div className="text-gray-800 font-mono text-sm whitespace-pre-wrap">{liveOutput}</div>
+        </div>
+      )}
+
       {/* Results */}
       {result && (
         <div className="mt-4">
@@ -81,6 +114,7 @@ const CodeExecutor: React.FC<CodeExecutorProps> = ({ code, onExecute }) => {
                 {result.execution_time && (
                   <div className="text-green-600 text-xs mt-2">
                     Время выполнения: {result.execution_time.toFixed(3)}с
+                    {result.cached && ' (результат из кеша)'}
                   </div>
                 )}
               </div>
@@ -90,6 +124,56 @@ const CodeExecutor: React.FC<CodeExecutorProps> = ({ code, onExecute }) => {
               </div>
             )}
           </div>
+
+          {result.figures && result.figures.length > 0 && (
+            <div className="mt-4 space-y-4">
+              {result.figures.map((figureId) => (
+                <img
+                  key={figureId}
+                  src={figureUrl(figureId)}
+                  alt="График, построенный кодом"
+                  loading="lazy"
+                  className="max-w-full rounded-md border border-gray-200 bg-white"
+                />
+              ))}
+            </div>
+          )}
+
+          {result.profile && (
+            <div className="mt-4 p-4 rounded-md bg-white border border-gray-200 overflow-x-auto">
+              <h4 className="text-md font-medium text-gray-900 mb-2">
+                Профиль (пик памяти: {(result.profile.peak_memory / 1024).toFixed(1)} КБ)
+              </h4>
+              <table className="text-xs font-mono w-full">
+                <thead>
+                  <tr className="text-left text-gray-600">
+                    <th className="pr-4">Функция</th>
+                    <th className="pr-4">Вызовы</th>
+                    <th className="pr-4">Собственное, с</th>
+                    <th>Накопленное, с</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {result.profile.functions.map((fn, index) => (
+                    <tr key={index}>
+                      <td className="pr-4">{fn.function} ({fn.filename}:{fn.line})</td>
+                      <td className="pr-4">{fn.calls}</td>
+                      <td className="pr-4">{fn.total_time.toFixed(4)}</td>
+                      <td>{fn.cumulative_time.toFixed(4)}</td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+              <h5 className="text-sm font-medium text-gray-900 mt-4 mb-1">Выделения памяти</h5>
+              <ul className="text-xs font-mono">
+                {result.profile.allocations.map((alloc, index) => (
+                  <li key={index}>
+                    {alloc.filename}:{alloc.line} — {(alloc.size / 1024).toFixed(1)} КБ ({alloc.count} объектов)
+                  </li>
+                ))}
+              </ul>
+            </div>
+          )}
         </div>
       )}
     </div>
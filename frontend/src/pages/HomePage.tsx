@@ -9,18 +9,21 @@ const HomePage: React.FC = () => {
   const navigate = useNavigate();
   const [searchResults, setSearchResults] = useState<SearchResponse | null>(null);
   const [graduationYears, setGraduationYears] = useState<number[]>([]);
+  const [yearCounts, setYearCounts] = useState<Record<string, number>>({});
   const [loading, setLoading] = useState(false);
   const [recentStudents, setRecentStudents] = useState<Student[]>([]);
+  const [lastSearch, setLastSearch] = useState<{ query: string; year?: number }>({ query: '' });
 
   useEffect(() => {
     // Load graduation years and recent students on component mount
     const loadInitialData = async () => {
       try {
         const [years, students] = await Promise.all([
-          studentApi.getGraduationYears(),
-          studentApi.getStudents() // Get all students
+          studentApi.getYearCounts(),
+          studentApi.getRecentStudents()
         ]);
-        setGraduationYears(years);
+        setGraduationYears(years.years);
+        setYearCounts(years.counts);
         setRecentStudents(students);
       } catch (error) {
         console.error('Failed to load initial data:', error);
@@ -30,22 +33,23 @@ const HomePage: React.FC = () => {
     loadInitialData();
   }, []);
 
-  const handleSearch = async (query: string, year?: number) => {
+  const handleSearch = async (query: string, year?: number, page: number = 1) => {
     if (!query.trim() && !year) {
       setSearchResults(null);
       return;
     }
 
+    setLastSearch({ query, year });
     setLoading(true);
     try {
-      const results = await studentApi.searchStudents(query, year);
+      const results = await studentApi.searchStudents(query, year, page);
       setSearchResults(results);
     } catch (error) {
       console.error('Search failed:', error);
       setSearchResults({
         students: [],
         total: 0,
-        page: 1,
+        page,
         per_page: 20,
         total_pages: 0,
       });
@@ -54,6 +58,11 @@ const HomePage: React.FC = () => {
     }
   };
 
+  const handlePageChange = (page: number) => {
+    handleSearch(lastSearch.query, lastSearch.year, page);
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+  };
+
   const handleStudentClick = (studentId: string) => {
     navigate(`/student/${studentId}`);
   };
@@ -113,6 +122,29 @@ const HomePage: React.FC = () => {
                 <p className="text-gray-500">Не найдено студентов, соответствующих критериям поиска.</p>
               </div>
             )}
+
+            {/* Pagination */}
+            {searchResults.total_pages > 1 && (
+              <div className="flex justify-center items-center gap-4 mt-6">
+                <button
+                  onClick={() => handlePageChange(searchResults.page - 1)}
+                  disabled={loading || searchResults.page <= 1}
+                  className="px-4 py-2 bg-white rounded-lg shadow-md hover:bg-blue-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  ← Назад
+                </button>
+                <span className="text-gray-600">
+                  Страница {searchResults.page} из {searchResults.total_pages}
+                </span>
+                <button
+                  onClick={() => handlePageChange(searchResults.page + 1)}
+                  disabled={loading || searchResults.page >= searchResults.total_pages}
+                  className="px-4 py-2 bg-white rounded-lg shadow-md hover:bg-blue-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  Вперед →
+                </button>
+              </div>
+            )}
           </div>
         )}
 
@@ -144,7 +176,11 @@ const HomePage: React.FC = () => {
                   className="bg-white p-4 rounded-lg shadow-md hover:shadow-lg hover:bg-blue-50 transition-all duration-200 text-center"
                 >
                   <div className="text-2xl font-bold text-blue-600">{year}</div>
-                  <div className="text-sm text-gray-600">Посмотреть дипломные работы</div>
+                  <div className="text-sm text-gray-600">
+                    {yearCounts[year] !== undefined
+                      ? `Дипломных работ: ${yearCounts[year]}`
+                      : 'Посмотреть дипломные работы'}
+                  </div>
                 </button>
               ))}
             </div>
@@ -59,12 +59,20 @@ const StudentPage: React.FC = () => {
     }
   };
 
-  const handleExecuteCode = async (args?: string): Promise<ExecutionResult> => {
+  const handleExecuteCode = async (
+    args?: string,
+    onOutput?: (chunk: string) => void,
+    profile?: boolean
+  ): Promise<ExecutionResult> => {
     if (!student) {
       throw new Error('Student not loaded');
     }
 
-    return await studentApi.executeCode(student.id, { args });
+    const request = { args, use_cache: true, profile };
+    if (onOutput) {
+      return await studentApi.executeCodeStream(student.id, request, onOutput);
+    }
+    return await studentApi.executeCode(student.id, request);
   };
 
   if (loading) {
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Student, SearchResponse, ExecutionRequest, ExecutionResult } from '../types/thesis';
+import { Student, SearchResponse, ExecutionRequest, ExecutionResult, FacetFilters, FacetsResponse, JobStatus, BatchExecutionRequest, BatchExecutionResult, YearsResponse } from '../types/thesis';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api/v1';
 
@@ -23,23 +23,41 @@ export const studentApi = {
     return response.data;
   },
 
-  // Search students
+  // Search students (paginated on the server)
   searchStudents: async (
     query?: string,
-    year?: number
+    year?: number,
+    page: number = 1,
+    perPage: number = 20,
+    sort?: string
   ): Promise<SearchResponse> => {
     const params = new URLSearchParams();
     if (query) params.append('search', query);
     if (year) params.append('year', year.toString());
+    if (sort) params.append('sort', sort);
+    params.append('page', page.toString());
+    params.append('per_page', perPage.toString());
 
     const response = await api.get(`/students?${params}`);
-    return {
-      students: response.data.students,
-      total: response.data.total,
-      page: 1,
-      per_page: response.data.total,
-      total_pages: 1
-    };
+    return response.data;
+  },
+
+  // Get the most recently added students
+  getRecentStudents: async (limit: number = 12): Promise<Student[]> => {
+    const response = await api.get(`/students?sort=-added_date&per_page=${limit}`);
+    return response.data.students;
+  },
+
+  // Get facet counts for the current query and filters
+  getFacets: async (query?: string, filters: FacetFilters = {}): Promise<FacetsResponse> => {
+    const params = new URLSearchParams();
+    if (query) params.append('search', query);
+    Object.entries(filters).forEach(([name, value]) => {
+      if (value !== undefined && value !== null) params.append(name, String(value));
+    });
+
+    const response = await api.get(`/facets?${params}`);
+    return response.data;
   },
 
   // Get graduation years
@@ -48,6 +66,12 @@ export const studentApi = {
     return response.data.years;
   },
 
+  // Get graduation years with student counts
+  getYearCounts: async (): Promise<YearsResponse> => {
+    const response = await api.get('/years');
+    return response.data;
+  },
+
   // Get students by year
   getStudentsByYear: async (year: number): Promise<Student[]> => {
     const response = await api.get(`/students?year=${year}`);
@@ -60,6 +84,70 @@ export const studentApi = {
     return response.data;
   },
 
+  // Execute student code, receiving its output as it is printed (Server-Sent Events)
+  executeCodeStream: async (
+    studentId: string,
+    request: ExecutionRequest,
+    onOutput: (chunk: string) => void
+  ): Promise<ExecutionResult> => {
+    const response = await fetch(`${API_BASE_URL}/students/${studentId}/execute/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(request),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Execution failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result: ExecutionResult | null = null;
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const event = message.match(/^event: (.*)$/m)?.[1];
+        const data = message.match(/^data: (.*)$/m)?.[1];
+        if (data === undefined) continue;
+        if (event === 'output') onOutput(JSON.parse(data));
+        if (event === 'result') result = JSON.parse(data);
+      }
+    }
+    if (!result) {
+      throw new Error('Execution stream ended without a result');
+    }
+    return result;
+  },
+
+  // Execute student code once per argument set (parameter sweep)
+  executeBatch: async (studentId: string, request: BatchExecutionRequest): Promise<BatchExecutionResult> => {
+    const response = await api.post(`/students/${studentId}/execute/batch`, request);
+    return response.data;
+  },
+
+  // Queue execution of student code, returns the job immediately
+  submitExecutionJob: async (studentId: string, request: ExecutionRequest): Promise<JobStatus> => {
+    const response = await api.post(`/students/${studentId}/jobs`, request);
+    return response.data;
+  },
+
+  // Get status (and result, once finished) of an execution job
+  getJob: async (jobId: string): Promise<JobStatus> => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+  },
+
+  // Cancel a queued or running execution job
+  cancelJob: async (jobId: string): Promise<JobStatus> => {
+    const response = await api.post(`/jobs/${jobId}/cancel`);
+    return response.data;
+  },
+
   // Get student code info
   getStudentCodeInfo: async (studentId: string) => {
     const response = await api.get(`/students/${studentId}/code`);
@@ -85,4 +173,7 @@ export const studentApi = {
   }
 };
 
+// URL of a figure produced by a code execution
+export const figureUrl = (figureId: string): string => `${API_BASE_URL}/figures/${figureId}`;
+
 export default api;
\ No newline at end of file
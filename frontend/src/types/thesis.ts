@@ -27,16 +27,82 @@ export interface Student {
   updated_at?: string;
 }
 
+export interface FacetCount {
+  value: string | number | boolean;
+  count: number;
+}
+
+export interface Facets {
+  year: FacetCount[];
+  advisor: FacetCount[];
+  keyword: FacetCount[];
+  has_code: FacetCount[];
+}
+
+export interface FacetFilters {
+  year?: number;
+  advisor?: string;
+  keyword?: string;
+  has_code?: boolean;
+}
+
+export interface FacetsResponse {
+  total: number;
+  facets: Facets;
+}
+
+export interface YearsResponse {
+  years: number[];
+  counts: Record<string, number>;
+}
+
 export interface SearchResponse {
   students: Student[];
   total: number;
   page: number;
   per_page: number;
   total_pages: number;
+  facets?: Facets;
 }
 
 export interface ExecutionRequest {
   args?: string;
+  seed?: number;
+  use_cache?: boolean;
+  profile?: boolean;
+}
+
+export interface ProfileFunction {
+  function: string;
+  filename: string;
+  line: number;
+  calls: number;
+  total_time: number;
+  cumulative_time: number;
+}
+
+export interface ProfileAllocation {
+  filename: string;
+  line: number;
+  size: number;
+  count: number;
+}
+
+export interface ExecutionProfile {
+  functions: ProfileFunction[];
+  allocations: ProfileAllocation[];
+  peak_memory: number;
+}
+
+export interface ExecutionStats {
+  queue_wait: number;
+  compile: number;
+  setup: number;
+  run: number;
+  render: number;
+  serialization: number;
+  cpu_time: number;
+  peak_rss: number;
 }
 
 export interface ExecutionResult {
@@ -44,6 +110,32 @@ export interface ExecutionResult {
   result?: string;
   error?: string;
   execution_time?: number;
+  cached?: boolean;
+  profile?: ExecutionProfile;
+  figures?: string[];
+  stats?: ExecutionStats;
+}
+
+export interface BatchExecutionRequest {
+  args: (string | null)[];
+  seed?: number;
+  use_cache?: boolean;
+}
+
+export interface BatchExecutionResult {
+  results: ExecutionResult[];
+  execution_time: number;
+}
+
+export interface JobStatus {
+  job_id: string;
+  student_id: string;
+  status: 'queued' | 'running' | 'completed' | 'cancelled';
+  queue_position?: number;
+  created_at: string;
+  started_at?: string;
+  finished_at?: string;
+  result?: ExecutionResult;
 }
 
 export interface ExecutionLog {
@@ -79,4 +171,6 @@ export interface Statistics {
     count: number;
     with_code: number;
   }>;
+  top_advisors?: Array<{ name: string; count: number }>;
+  top_keywords?: Array<{ name: string; count: number }>;
 }
\ No newline at end of file